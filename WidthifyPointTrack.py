@@ -1,26 +1,11 @@
 import arcpy
-from math import atan2, pi
-import sys
-
-# overwrite outputs
-arcpy.env.overwriteOutput = True
-
-# input dataset
-source_points = arcpy.GetParameterAsText(0)  # source dataset
-
-# input parameters
-case_field = arcpy.GetParameterAsText(1)  # parameter to control breaking lines
-sort_field = arcpy.GetParameterAsText(2)  # parameter to control sorting vertices
-primary_p = arcpy.GetParameterAsText(3)  # parameter used to stretch the geometry width
-secondary_p = arcpy.GetParameterAsText(4)  # secondary variable that we'll carry over for symbology
-min_width = arcpy.GetParameterAsText(5)  # minimum width of a polygon that should be created
-max_width = arcpy.GetParameterAsText(6)  # maximum width of a polygon that should be created
-cap_type = arcpy.GetParameterAsText(7)  # select the end cap type
-break_dict = {}  # containing to hold break values
-
-# output parameters
-output_polygons = arcpy.GetParameterAsText(8)  # output location FGDB
+import numpy as np
+import os
 
+from widthify import (WidthScale, ClassedWidthScale, Pipeline, Progress, Writer, FeatureClassSink, TableSink, SINKS,
+                      iter_tracks, open_sink, output_fields, track_fields, scan_range, track_state, IncrementalPlan,
+                      OffsetCache, PointStore, Instruments, RunProfiler, ExternalSort, row_batches, GEODESIC,
+                      PLANAR)
 
 format_dict = {'String': 'Text', 'Integer': 'Long', 'OID': 'Short', 'Double': 'Double', 'Date': 'Date', 'SmallInteger': 'Short'}
 
@@ -30,471 +15,436 @@ def msg(message):
     print(message)
 
 
-def width_buffer(attribute_value, actual_values, min_bound, max_bound):
-    # scale incoming attribute values to fit within defined buffer range
-    # this converts the attribute value to a buffer distance within defined range
-    width = round(((float(max_bound) - float(min_bound))*(attribute_value - min(actual_values))/(max(actual_values)-min(actual_values))) + float(min_bound), 0)/2
-    return width
-
-
-def find_angle(x1, x2, y1, y2):
-    dx = x2 - x1
-    dy = y2 - y1
-    found_angle = atan2(dx, dy) * 180 / pi
-    return found_angle
-
-
-# gather details pertaining to the primary attribute variable
-msg('Understanding the primary attribute parameter...')
-value_list = []
-with arcpy.da.SearchCursor(in_table=source_points, field_names=primary_p) as parameter_cursor:
-    msg('...scanning attribute values...')
-    for row in parameter_cursor:
-        value_list.append(row[0])
-msg('Scan complete.\n\n')
-
-# assign min/max values
-min_attribute = min(value_list)
-max_attribute = max(value_list)
-msg('Minimum and maximum values assigned: min({0}), max({1})'.format(min_attribute, max_attribute))
-range_attribute = max_attribute - min_attribute
-msg('Range identified: {0}'.format(range_attribute))
-
-
-# create the output feature class
-# find and assign the workspace
-workspace_index = output_polygons.rfind('\\')
-workspace = output_polygons[:workspace_index]
-output_name = output_polygons[workspace_index + 1:]
-# set spatial reference to match the input
-sr = arcpy.Describe(source_points).spatialReference
-msg('Creating "{0}" feature class to store outputs'.format(output_name))
-msg('...output spatial reference: {0}'.format(sr))
-arcpy.CreateFeatureclass_management(out_path=workspace,
-                                        out_name=output_name,
-                                        geometry_type="POLYGON",
-                                        spatial_reference=sr)
-
-# add schema
-msg('...adding required fields...')
-# get case and sort fields
-fields = arcpy.ListFields(source_points)
-case_sort_dict = {}
-for field in fields:
-    if field.name == case_field:
-        case_sort_dict['case_type'] = format_dict[field.type]
-    elif field.name == sort_field:
-        case_sort_dict['sort_type'] = format_dict[field.type]
-    else:
-        pass
-# create fields
-arcpy.AddFields_management(in_table=output_polygons, field_description=[
-    ['POINT_FID', 'SHORT'],
-    ['CASE_FIELD', case_sort_dict['case_type']],
-    ['SORT_FIELD', case_sort_dict['sort_type']],
-    ['PRIMARY_VALUE_FROM', 'DOUBLE'],
-    ['PRIMARY_VALUE_TO', 'DOUBLE'],
-    ['PRIMARY_CLASSED_FROM', 'SHORT'],
-    ['PRIMARY_CLASSED_TO', 'SHORT'],
-    ['SECONDARY_VALUE_FROM', 'DOUBLE'],
-    ['SECONDARY_VALUE_TO', 'DOUBLE'],
-    ['POLYGON_ANGLE', 'DOUBLE']
-    ])
-msg('Output feature class created.')
-
-# open search cursor on input points to gather geometry
-index = 0
-feature_dict = {}
-with arcpy.da.SearchCursor(in_table=source_points, field_names=['OBJECTID', case_field, sort_field,
-                                                                primary_p,
-                                                                secondary_p,
-                                                                'SHAPE@X',
-                                                                'SHAPE@Y'],
-                           sql_clause=(None,'ORDER BY {0}, {1}'.format(case_field,sort_field))) as s_cursor:
-    for row in s_cursor:
-        feature_dict[index] = [row[0], row[1], row[2], row[3], row[4], row[5], row[6]]
-        index +=1
-
-msg('Input point features consumed.')
-
-# use attributes collected and construct new features from the dictionary
-# msg('LAST ITEM: {0}'.format(list(feature_dict.keys())[-1]))
-with arcpy.da.InsertCursor(in_table=output_polygons, field_names=[
-    'POINT_FID',
-    'CASE_FIELD',
-    'SORT_FIELD',
-    'PRIMARY_VALUE_FROM',
-    'PRIMARY_VALUE_TO',
-    'PRIMARY_CLASSED_FROM',
-    'PRIMARY_CLASSED_TO',
-    'SECONDARY_VALUE_FROM',
-    'SECONDARY_VALUE_TO',
-    'POLYGON_ANGLE',
-    'SHAPE@'
-]) as i_cursor:
-    record = 0
-    # iterate through the values in the feature_dictionary and construct new geometry for each set of points
-    for key, value in feature_dict.items():
-        current_case = feature_dict[key][1]
-        msg('Processing {0} of {1} points with case {2}...'.format(key, list(feature_dict.keys())[-1], current_case))
-        if key == list(feature_dict.keys())[-1] - 1:
-            # process as the point that terminates a line and the dataset
-            msg('process as a line and dataset terminator')
-            if cap_type == "TAPER":
-                # define reference points for taper
-                cx = float(feature_dict[key][5])
-                cy = float(feature_dict[key][6])
-
-                px = float(feature_dict[key - 1][5])
-                py = float(feature_dict[key - 1][6])
-
-                nx = float(feature_dict[key + 1][5])
-                ny = float(feature_dict[key + 1][6])
-
-                # find the angle between the initial point and the proceeding point
-                angle = find_angle(px, nx, py, ny)
-
-                # calculate the offset for the proceeding point
-                offset1 = width_buffer(feature_dict[key][3], value_list, min_width, max_width)
-                offset2 = width_buffer(feature_dict[key][3], value_list, min_width, max_width)
-
-                # create a point geometry object based on the first point
-                current_point = arcpy.PointGeometry(
-                    arcpy.Point(nx, ny), sr)  # reconstruct geometry of selected point
-                new_point1 = current_point  # commit the coordinates of the first point as a point object variable
-                del current_point
-
-                # construct a pair of points based on the second last point and the calculated offset
-                next_point = arcpy.PointGeometry(
-                    arcpy.Point(cx, cy), sr)  # reconstruct geometry of the proceeding point
-                new_point3 = next_point.pointFromAngleAndDistance(angle + 90, offset1, "GEODESIC")
-                new_point2 = next_point.pointFromAngleAndDistance(angle - 90, offset1, "GEODESIC")
-                del next_point
-
-                # create a set of polygon coordinates from the 3 coordinate pairs
-                new_pointList = [new_point1, new_point2, new_point3]
-                coordinates = []
-
-            else:
-                # define reference points for butt cap
-                cx = float(feature_dict[key][5])
-                cy = float(feature_dict[key][6])
-
-                px = float(feature_dict[key - 1][5])
-                py = float(feature_dict[key - 1][6])
-
-                nx = float(feature_dict[key + 1][5])
-                ny = float(feature_dict[key + 1][6])
-
-                # find the angle between the initial point and the proceeding point
-                angle = find_angle(px, nx, py, ny)
-
-                # generate an offset distance using the width_factor of the point
-                offset1 = width_buffer(feature_dict[key][3], value_list, min_width, max_width)
-                offset2 = width_buffer(feature_dict[key - 1][3], value_list, min_width, max_width)
-
-                # create new points based on the current points
-                current_point = arcpy.PointGeometry(
-                    arcpy.Point(cx, cy), sr)  # reconstruct geometry of selected point
-                new_point1 = current_point.pointFromAngleAndDistance(angle + 90, offset1, "GEODESIC")
-                new_point2 = current_point.pointFromAngleAndDistance(angle - 90, offset1, "GEODESIC")
-                del current_point
-
-                next_point = arcpy.PointGeometry(
-                    arcpy.Point(nx, ny), sr)  # reconstruct geometry of the proceeding point
-                new_point4 = next_point.pointFromAngleAndDistance(angle + 90, offset2, "GEODESIC")
-                new_point3 = next_point.pointFromAngleAndDistance(angle - 90, offset2, "GEODESIC")
-                del next_point
-
-                # create new polygon coordinates
-                new_pointList = [new_point1, new_point2, new_point3, new_point4]
-                coordinates = []
-
-            # insert new polygon using generated coordinates
-            for pnt in new_pointList:
-                coord_parts = pnt.getPart(0)
-                coords = (coord_parts.X, coord_parts.Y)
-                coordinates.append(coords)
-
-            try:
-                # attempt to insert a polygon into the new feature class
-                # msg('Attempting insert')
-                data = [feature_dict[key][0], feature_dict[key][1], feature_dict[key][2], feature_dict[key][3],
-                        feature_dict[key + 1][3], offset1, offset2, feature_dict[key][4],
-                        feature_dict[key + 1][4], find_angle(px, nx, py, ny), coordinates]
-                i_cursor.insertRow(data)
-
-            except:
-                e = sys.exc_info()[1]
-                msg('Insert failed: {0}'.format(e.args[0]))
-
-        elif key == list(feature_dict.keys())[-1]:
-            # process as the final point and skip it
-            msg('process as final point, therefore skip')
+def start_progressor(label):
+    arcpy.SetProgressor('step', label, 0, 100, 1)
 
-        else:
-            next_case = feature_dict[key + 1][1]
-            # last_case = feature_dict[key - 1][1]
-            msg('current case: {0} - next case: {1}'.format(current_case, next_case))
-            if record == 0:
-                # process new first point
-                msg('processing new first point...')
-                if cap_type == "TAPER":
-                    msg(key)
-                    # define reference points for taper
-                    cx = float(feature_dict[key][5])
-                    cy = float(feature_dict[key][6])
-
-                    nx = float(feature_dict[key + 1][5])
-                    ny = float(feature_dict[key + 1][6])
-
-                    nx2 = float(feature_dict[key + 2][5])
-                    ny2 = float(feature_dict[key + 2][6])
-
-                    # find the angle between the initial point and the proceeding point
-                    angle = find_angle(cx, nx2, cy, ny2)
-
-                    # calculate the offset for the proceeding point
-                    offset1 = width_buffer(feature_dict[key + 1][3], value_list, min_width, max_width)
-                    offset2 = width_buffer(feature_dict[key][3], value_list, min_width, max_width)
-
-                    # create a point geometry object based on the first point
-                    current_point = arcpy.PointGeometry(
-                        arcpy.Point(cx, cy), sr)  # reconstruct geometry of selected point
-                    new_point1 = current_point  # commit the coordinates of the first point as a point object variable
-                    del current_point
-
-                    # construct a pair of points based on the second point and the calculated offset
-                    next_point = arcpy.PointGeometry(
-                        arcpy.Point(nx, ny), sr)  # reconstruct geometry of the proceeding point
-                    new_point3 = next_point.pointFromAngleAndDistance(angle + 90, offset1, "GEODESIC")
-                    new_point2 = next_point.pointFromAngleAndDistance(angle - 90, offset1, "GEODESIC")
-                    del next_point
-
-                    # create a set of polygon coordinates from the 3 coordinate pairs
-                    new_pointList = [new_point1, new_point2, new_point3]
-                    coordinates = []
-
-                else:
-                    # define reference points for butt cap
-                    cx = float(feature_dict[key][5])
-                    cy = float(feature_dict[key][6])
-
-                    nx = float(feature_dict[key + 1][5])
-                    ny = float(feature_dict[key + 1][6])
-
-                    nx2 = float(feature_dict[key + 2][5])
-                    ny2 = float(feature_dict[key + 2][6])
-
-                    # find the angle between the initial point and the proceeding point
-                    angle = find_angle(cx, nx2, cy, ny2)
-
-                    # generate an offset distance using the width_factor of the point
-                    offset1 = width_buffer(feature_dict[key][3], value_list, min_width, max_width)
-                    offset2 = width_buffer(feature_dict[key + 1][3], value_list, min_width, max_width)
-
-
-                    # create new points based on the current points
-                    current_point = arcpy.PointGeometry(
-                        arcpy.Point(cx, cy), sr)  # reconstruct geometry of selected point
-                    new_point1 = current_point.pointFromAngleAndDistance(angle + 90, offset1, "GEODESIC")
-                    new_point2 = current_point.pointFromAngleAndDistance(angle - 90, offset1, "GEODESIC")
-                    del current_point
-
-                    next_point = arcpy.PointGeometry(
-                        arcpy.Point(nx, ny), sr)  # reconstruct geometry of the proceeding point
-                    new_point4 = next_point.pointFromAngleAndDistance(angle + 90, offset2, "GEODESIC")
-                    new_point3 = next_point.pointFromAngleAndDistance(angle - 90, offset2, "GEODESIC")
-                    del next_point
-
-                    # create new polygon coordinates
-                    new_pointList = [new_point1, new_point2, new_point3, new_point4]
-                    coordinates = []
-
-                # insert new polygon using generated coordinates
-                for pnt in new_pointList:
-                    coord_parts = pnt.getPart(0)
-                    coords = (coord_parts.X, coord_parts.Y)
-                    coordinates.append(coords)
-
-                try:
-                    # attempt to insert a polygon into the new feature class
-                    # msg('Attempting insert')
-                    data = [feature_dict[key][0], feature_dict[key][1], feature_dict[key][2], feature_dict[key][3],
-                            feature_dict[key + 1][3], offset2, offset1, feature_dict[key][4],
-                            feature_dict[key + 1][4], find_angle(cx, nx, cy, ny), coordinates]
-                    i_cursor.insertRow(data)
-
-                except:
-                    e = sys.exc_info()[1]
-                    msg('Insert failed: {0}'.format(e.args[0]))
-
-                # increment the record counter
-                record += 1
-
-            elif record > 0 and current_case == next_case and current_case == feature_dict[key + 2][1]:
-                # process continuation point
-                msg('processing continuation point...')
-
-                cx = float(feature_dict[key][5])
-                cy = float(feature_dict[key][6])
-
-                px = float(feature_dict[key - 1][5])
-                py = float(feature_dict[key - 1][6])
-
-                nx1 = float(feature_dict[key + 1][5])
-                ny1 = float(feature_dict[key + 1][6])
-
-                nx = float(feature_dict[key + 2][5])
-                ny = float(feature_dict[key + 2][6])
-
-                # find the angle between preceding point and the proceeding point
-                angle1 = find_angle(px, nx1, py, ny1)
-
-                # find the angle between the proceeding point and the point proceeding that one
-                angle2 = find_angle(cx, nx, cy, ny)
-
-                # generate an offset distance using the width_factor and the primary attribute value of the point
-                offset1 = width_buffer(feature_dict[key][3], value_list, min_width, max_width)
-                offset2 = width_buffer(feature_dict[key + 1][3], value_list, min_width, max_width)
-
-                # report width factor and break value
-                # create new points based on the current point
-                current_point = arcpy.PointGeometry(
-                    arcpy.Point(cx, cy), sr)  # reconstruct geometry of selected point
-                new_point1 = current_point.pointFromAngleAndDistance(angle1 + 90, offset1, "GEODESIC")
-                new_point2 = current_point.pointFromAngleAndDistance(angle1 - 90, offset1, "GEODESIC")
-                del current_point
-
-                next_point = arcpy.PointGeometry(
-                    arcpy.Point(nx1, ny1), sr)  # reconstruct geometry of the proceeding point
-                new_point4 = next_point.pointFromAngleAndDistance(angle2 + 90, offset2, "GEODESIC")
-                new_point3 = next_point.pointFromAngleAndDistance(angle2 - 90, offset2, "GEODESIC")
-                del next_point
-
-                # create new polygon
-                new_pointList = [new_point1, new_point2, new_point3, new_point4]
-                coordinates = []
-                for pnt in new_pointList:
-                    coord_parts = pnt.getPart(0)
-                    coords = (coord_parts.X, coord_parts.Y)
-                    coordinates.append(coords)
-
-                try:
-                    # attempt to insert a polygon into the new feature class
-                    # msg('Attempting insert')
-                    data = [feature_dict[key][0], feature_dict[key][1], feature_dict[key][2], feature_dict[key][3],
-                            feature_dict[key + 1][3], offset1, offset2, feature_dict[key][4],
-                            feature_dict[key + 1][4], find_angle(cx, nx1, cy, ny1), coordinates]
-                    i_cursor.insertRow(data)
-
-                except:
-                    e = sys.exc_info()[1]
-                    msg('Insert failed: {0}'.format(e.args[0]))
-                # increment the record counter
-                record += 1
-
-            elif record > 0 and current_case != next_case:
-                # process as a line termination point
-                msg('processing termination point...')
-                if cap_type == "TAPER":
-                    # define reference points for taper
-                    cx = float(feature_dict[key][5])
-                    cy = float(feature_dict[key][6])
-
-                    px = float(feature_dict[key - 1][5])
-                    py = float(feature_dict[key - 1][6])
-
-                    px2 = float(feature_dict[key - 2][5])
-                    py2 = float(feature_dict[key - 2][6])
-
-                    # find the angle between the initial point and the proceeding point
-                    angle = find_angle(px2, cx, py2, cy)
-
-                    # calculate the offset for the proceeding point
-
-                    offset1 = width_buffer(feature_dict[key - 1][3], value_list, min_width, max_width)
-                    offset2 = width_buffer(feature_dict[key][3], value_list, min_width, max_width)
-
-                    # create a point geometry object based on the first point
-                    current_point = arcpy.PointGeometry(
-                        arcpy.Point(cx, cy), sr)  # reconstruct geometry of selected point
-                    new_point1 = current_point  # commit the coordinates of the first point as a point object variable
-                    del current_point
-
-                    # construct a pair of points based on the second last point and the calculated offset
-                    next_point = arcpy.PointGeometry(
-                        arcpy.Point(px, py), sr)  # reconstruct geometry of the proceeding point
-                    new_point3 = next_point.pointFromAngleAndDistance(angle + 90, offset1, "GEODESIC")
-                    new_point2 = next_point.pointFromAngleAndDistance(angle - 90, offset1, "GEODESIC")
-                    del next_point
-
-                    # create a set of polygon coordinates from the 3 coordinate pairs
-                    new_pointList = [new_point1, new_point2, new_point3]
-                    coordinates = []
-
-                else:
-                    # define reference points for butt cap
-                    cx = float(feature_dict[key][5])
-                    cy = float(feature_dict[key][6])
-
-                    px = float(feature_dict[key - 1][5])
-                    py = float(feature_dict[key - 1][6])
-
-                    px2 = float(feature_dict[key - 2][5])
-                    py2 = float(feature_dict[key - 2][6])
-
-                    c_x1 = float(feature_dict[key][5])
-                    c_x2 = float(feature_dict[key + 1][5])
-                    c_y1 = float(feature_dict[key][6])
-                    c_y2 = float(feature_dict[key + 1][6])
-
-                    # find the angle between the initial point and the proceeding point
-                    angle1 = find_angle(px2, cx, py2, cy)
-                    angle2 = find_angle(px, cx, py, cy)
-
-                    # generate an offset distance using the width_factor of the point
-                    offset1 = width_buffer(feature_dict[key][3], value_list, min_width, max_width)
-                    offset2 = width_buffer(feature_dict[key - 1][3], value_list, min_width, max_width)
-
-                    # create new points based on the current points
-                    current_point = arcpy.PointGeometry(
-                        arcpy.Point(cx, cy), sr)  # reconstruct geometry of selected point
-                    new_point1 = current_point.pointFromAngleAndDistance(angle2 + 90, offset1, "GEODESIC")
-                    new_point2 = current_point.pointFromAngleAndDistance(angle2 - 90, offset1, "GEODESIC")
-                    del current_point
-
-                    next_point = arcpy.PointGeometry(
-                        arcpy.Point(px, py), sr)  # reconstruct geometry of the proceeding point
-                    new_point4 = next_point.pointFromAngleAndDistance(angle1 + 90, offset2, "GEODESIC")
-                    new_point3 = next_point.pointFromAngleAndDistance(angle1 - 90, offset2, "GEODESIC")
-                    del next_point
-
-                    # create new polygon coordinates
-                    new_pointList = [new_point1, new_point2, new_point3, new_point4]
-                    coordinates = []
-
-                # insert new polygon using generated coordinates
-                for pnt in new_pointList:
-                    coord_parts = pnt.getPart(0)
-                    coords = (coord_parts.X, coord_parts.Y)
-                    coordinates.append(coords)
-
-                try:
-                    # attempt to insert a polygon into the new feature class
-                    # msg('Attempting insert')
-                    data = [feature_dict[key][0], feature_dict[key][1], feature_dict[key][2], feature_dict[key - 1][3],
-                            feature_dict[key][3], offset1, offset2, feature_dict[key - 1][4],
-                            feature_dict[key][4], find_angle(cx, nx, cy, ny), coordinates]
-                    i_cursor.insertRow(data)
-
-                except:
-                    e = sys.exc_info()[1]
-                    msg('Insert failed: {0}'.format(e.args[0]))
-
-                # increment the record counter
-                record = 0
 
+def arcpy_geodesic_offset(x, y, azimuth, distance):
+    # offset vertices of projected inputs geodesically through arcpy
+    out_x = np.empty(len(x))
+    out_y = np.empty(len(y))
+    for i in range(len(x)):
+        point = arcpy.PointGeometry(arcpy.Point(x[i], y[i]), sr)
+        offset_point = point.pointFromAngleAndDistance(azimuth[i], distance[i], "GEODESIC").firstPoint
+        out_x[i] = offset_point.X
+        out_y[i] = offset_point.Y
+    return out_x, out_y
 
 
+def search_points(source_points, point_fields, order_clause, sorter=None):
+    # rows of the input points ordered by case and sort, through the ORDER BY of the source or, for
+    # sources that do not honour it, by the tool
+    if sorter is None:
+        with arcpy.da.SearchCursor(in_table=source_points, field_names=point_fields,
+                                   sql_clause=order_clause) as s_cursor:
+            for row in s_cursor:
+                yield row
+    else:
+        with arcpy.da.SearchCursor(in_table=source_points, field_names=point_fields) as s_cursor:
+            for row in sorter.sort(s_cursor):
+                yield row
+
+
+def read_points(source_points, point_fields, order_clause, read_method, sorter=None):
+    # read the ordered input points into the point store in a single pass
+    if read_method == 'NUMPY':
+        # bulk load without a tuple per row, the array cannot be ordered by the source so it is ordered here
+        records = arcpy.da.FeatureClassToNumPyArray(source_points, point_fields,
+                                                    null_value={point_fields[3]: np.nan, point_fields[4]: np.nan})
+        return PointStore.from_numpy(records, point_fields).ordered()
+    return PointStore.from_rows(search_points(source_points, point_fields, order_clause, sorter))
+
+
+def read_plan(state_table):
+    # track states and settings recorded in the state table by the previous run
+    states = {}
+    settings = None
+    with arcpy.da.SearchCursor(state_table, ['CASE_VALUE', 'TAIL_SORT', 'RESTART_SORT', 'LAST_SORT'] +
+                               state_settings_fields) as state_cursor:
+        for row in state_cursor:
+            states[row[0]] = tuple(row[1:4])
+            settings = tuple(row[4:])
+    return IncrementalPlan(states, settings)
+
+
+def write_plan(state_table, states, settings, case_type, sort_type):
+    # record the state of every track along with the settings of this run
+    workspace, name = os.path.split(state_table)
+    arcpy.CreateTable_management(workspace, name)
+    arcpy.AddFields_management(in_table=state_table, field_description=[
+        ['CASE_VALUE', case_type],
+        ['TAIL_SORT', sort_type],
+        ['RESTART_SORT', sort_type],
+        ['LAST_SORT', sort_type],
+        ['MIN_VALUE', 'DOUBLE'],
+        ['MAX_VALUE', 'DOUBLE'],
+        ['MIN_WIDTH', 'DOUBLE'],
+        ['MAX_WIDTH', 'DOUBLE'],
+        ['CAP_TYPE', 'TEXT'],
+        ['OFFSET_METHOD', 'TEXT'],
+        ['SIMPLIFY_TOLERANCE', 'DOUBLE'],
+        ['VALUE_TOLERANCE', 'DOUBLE'],
+        ['WIDTH_MODE', 'TEXT'],
+        ['CLASS_BREAKS', 'TEXT']
+        ])
+    with arcpy.da.InsertCursor(state_table, ['CASE_VALUE', 'TAIL_SORT', 'RESTART_SORT', 'LAST_SORT'] +
+                               state_settings_fields) as state_cursor:
+        for case, state in states.items():
+            state_cursor.insertRow([case] + list(state) + list(settings))
+
+
+def delete_restarted(output, restarts):
+    # delete the segments of each track from its restart sort value onwards
+    deleted = 0
+    with arcpy.da.UpdateCursor(output, ['CASE_FIELD', 'SORT_FIELD']) as u_cursor:
+        for case, sort_value in u_cursor:
+            restart = restarts.get(case)
+            if restart is not None and sort_value >= restart:
+                u_cursor.deleteRow()
+                deleted += 1
+    return deleted
+
+
+def track_size(track):
+    # point count of a (case, rows) track as iter_tracks yields it
+    return len(track[1])
+
+
+state_settings_fields = ['MIN_VALUE', 'MAX_VALUE', 'MIN_WIDTH', 'MAX_WIDTH', 'CAP_TYPE', 'OFFSET_METHOD',
+                         'SIMPLIFY_TOLERANCE', 'VALUE_TOLERANCE', 'WIDTH_MODE', 'CLASS_BREAKS']
+
+
+# the tool runs under a main guard so worker processes of the PARALLEL mode can import this
+# script without running it again
+if __name__ == '__main__':
+    # overwrite outputs
+    arcpy.env.overwriteOutput = True
+
+    # input dataset
+    source_points = arcpy.GetParameterAsText(0)  # source dataset
+
+    # input parameters
+    case_field = arcpy.GetParameterAsText(1)  # parameter to control breaking lines
+    sort_field = arcpy.GetParameterAsText(2)  # parameter to control sorting vertices
+    primary_p = arcpy.GetParameterAsText(3)  # parameter used to stretch the geometry width
+    secondary_p = arcpy.GetParameterAsText(4)  # secondary variable that we'll carry over for symbology
+    min_width = arcpy.GetParameterAsText(5)  # minimum width of a polygon that should be created
+    max_width = arcpy.GetParameterAsText(6)  # maximum width of a polygon that should be created
+    cap_type = arcpy.GetParameterAsText(7)  # select the end cap type
+    break_dict = {}  # containing to hold break values
+
+    # output parameters
+    output_polygons = arcpy.GetParameterAsText(8)  # output location FGDB
+
+    # processing parameters
+    processing_mode = arcpy.GetParameterAsText(9) or 'IN_MEMORY'  # IN_MEMORY, STREAMING, PARALLEL or OVERLAPPED
+    min_value = arcpy.GetParameterAsText(10)  # optional known minimum of the primary attribute
+    max_value = arcpy.GetParameterAsText(11)  # optional known maximum of the primary attribute
+    worker_count = arcpy.GetParameterAsText(12)  # optional worker processes for PARALLEL, threads for OVERLAPPED
+    verbosity = arcpy.GetParameterAsText(13) or 'NORMAL'  # QUIET, NORMAL, VERBOSE or TRACE
+    offset_choice = arcpy.GetParameterAsText(14) or 'AUTO'  # AUTO, PLANAR or GEODESIC
+    update_mode = arcpy.GetParameterAsText(15) or 'REBUILD'  # REBUILD or INCREMENTAL
+    read_method = arcpy.GetParameterAsText(16) or 'CURSOR'  # CURSOR or NUMPY
+    output_geometry = arcpy.GetParameterAsText(17) or 'SEGMENTS'  # SEGMENTS or TRACKS
+    segment_table = arcpy.GetParameterAsText(18)  # optional table of segment attributes for TRACKS
+    simplify_tolerance = arcpy.GetParameterAsText(19)  # optional spatial tolerance in metres for simplifying tracks
+    value_tolerance = arcpy.GetParameterAsText(20)  # optional primary attribute tolerance for simplifying tracks
+    offset_cache_size = arcpy.GetParameterAsText(21) or '100000'  # offsets cached for arcpy geodesic offsets, 0 disables
+    width_mode = arcpy.GetParameterAsText(22) or 'CONTINUOUS'  # CONTINUOUS, EQUAL_INTERVAL, QUANTILE, JENKS or MANUAL
+    number_of_breaks = arcpy.GetParameterAsText(23) or '5'  # number of classes of the classed width modes
+    break_values = arcpy.GetParameterAsText(24)  # class upper bounds separated by semicolons for MANUAL
+    run_summary = arcpy.GetParameterAsText(25)  # optional JSON file receiving the time and counters of every stage
+    profile_output = arcpy.GetParameterAsText(26)  # optional profile of the run, .html/.txt for pyinstrument
+    sort_method = arcpy.GetParameterAsText(27) or 'AUTO'  # AUTO, SOURCE or TOOL
+    sort_chunk_size = arcpy.GetParameterAsText(28) or '5000000'  # points sorted in memory before spilling to disk
+
+    # report messages at the requested verbosity and move the progressor at most once per percent
+    log = Progress(emit=msg, level=verbosity, start=start_progressor, position=arcpy.SetProgressorPosition)
+
+    # time every stage of the run, and profile it when asked to
+    instruments = Instruments()
+    profiler = None
+    if profile_output:
+        profiler = RunProfiler(profile_output)
+        profiler.start()
+
+    # set spatial reference to match the input
+    sr = arcpy.Describe(source_points).spatialReference
+
+    # get case and sort field types for the output schema
+    case_sort_dict = {}
+    for field in arcpy.ListFields(source_points):
+        if field.name == case_field:
+            case_sort_dict['case_type'] = format_dict[field.type]
+        elif field.name == sort_field:
+            case_sort_dict['sort_type'] = format_dict[field.type]
+    fields = output_fields(case_sort_dict['case_type'], case_sort_dict['sort_type'])
+
+    # segments are written as separate polygons, or joined into a single polygon per track
+    if output_geometry == 'TRACKS':
+        segment_fields = fields
+        fields = track_fields(case_sort_dict['case_type'], case_sort_dict['sort_type'])
+        if update_mode == 'INCREMENTAL':
+            log.warning('Track polygons are rebuilt in full, incremental updates require the SEGMENTS output.')
+            update_mode = 'REBUILD'
+    elif segment_table:
+        log.warning('The segment table is only written alongside the TRACKS output.')
+        segment_table = ''
+
+    # choose how offset vertices are solved, AUTO offsets projected inputs in the plane
+    if offset_choice == 'AUTO':
+        offset_choice = GEODESIC if sr.type == 'Geographic' else PLANAR
+    width_factor = 1.0
+    spheroid = None
+    if offset_choice == PLANAR:
+        # perpendicular offsets in the units of the coordinate system, widths are given in metres
+        offset_method = PLANAR
+        if sr.type == 'Geographic':
+            log.warning('Planar offsets of a geographic input are applied in decimal degrees.')
+        else:
+            width_factor = 1.0 / sr.metersPerUnit
+    elif sr.type == 'Geographic':
+        # geographic inputs are offset along the spheroid of the input coordinate system
+        offset_method = GEODESIC
+        spheroid = (sr.semiMajorAxis, sr.flattening)
+    else:
+        # projected inputs are offset geodesically through arcpy, one point at a time, so offsets of
+        # repeated inputs are kept in a bounded cache and solved once
+        offset_method = arcpy_geodesic_offset
+        if int(offset_cache_size) > 0:
+            offset_method = OffsetCache(arcpy_geodesic_offset, size=int(offset_cache_size))
+    log.message('Offsets are solved with the {0} method.', offset_choice)
+
+    # tracks are simplified before construction when either tolerance is given, the spatial tolerance
+    # is given in metres and applied in the units of projected inputs
+    tolerance = float(simplify_tolerance) if simplify_tolerance else None
+    value_tolerance = float(value_tolerance) if value_tolerance else None
+    if tolerance is not None and sr.type != 'Geographic':
+        tolerance /= sr.metersPerUnit
+
+    point_count = int(arcpy.GetCount_management(source_points)[0])
+    point_fields = ['OBJECTID', case_field, sort_field, primary_p, secondary_p, 'SHAPE@X', 'SHAPE@Y']
+    order_clause = (None, 'ORDER BY {0}, {1}'.format(case_field, sort_field))
+
+    # shapefiles and text files ignore the ORDER BY, their points are sorted by the tool, in memory when
+    # they fit within a chunk and otherwise in chunks spilled to disk and merged
+    if sort_method == 'AUTO':
+        sort_method = 'TOOL' if os.path.splitext(source_points)[1].lower() in ('.shp', '.dbf', '.csv', '.txt') \
+            else 'SOURCE'
+    sorter = None
+    if sort_method == 'TOOL':
+        sorter = ExternalSort(chunk_points=int(sort_chunk_size), directory=arcpy.env.scratchFolder)
+        log.message('Points are sorted by the tool in chunks of up to {0} points.', int(sort_chunk_size))
+
+    # points processed as a whole are read into the point store in a single pass that also yields the
+    # attribute range
+    points = None
+    if processing_mode not in ('STREAMING', 'OVERLAPPED') and update_mode != 'INCREMENTAL':
+        with instruments.stage('read', point_count):
+            points = read_points(source_points, point_fields, order_clause, read_method, sorter)
+        log.message('Input point features consumed.')
+        log.verbose('Point store holds {0} points in {1:.1f} MiB.', len(points), points.nbytes / 1048576.0)
+
+    # quantile and natural breaks are computed from every primary value, read here when the points are
+    # not held as a whole
+    values = None
+    if width_mode in ('QUANTILE', 'JENKS'):
+        if points is not None:
+            values = points.primary
+        else:
+            with instruments.stage('scan', point_count), \
+                    arcpy.da.SearchCursor(in_table=source_points, field_names=primary_p) as parameter_cursor:
+                values = np.fromiter((np.nan if row[0] is None else row[0] for row in parameter_cursor),
+                                     dtype=np.float64)
+
+    # gather details pertaining to the primary attribute variable
+    if min_value and max_value:
+        # bounds supplied by the user, no need to scan the input
+        min_attribute = float(min_value)
+        max_attribute = float(max_value)
+    elif points is not None:
+        min_attribute, max_attribute = points.value_range()
+    elif values is not None:
+        min_attribute, max_attribute = float(np.nanmin(values)), float(np.nanmax(values))
+    else:
+        log.message('Understanding the primary attribute parameter...')
+        with instruments.stage('scan', point_count), \
+                arcpy.da.SearchCursor(in_table=source_points, field_names=primary_p) as parameter_cursor:
+            log.message('...scanning attribute values...')
+            min_attribute, max_attribute = scan_range(row[0] for row in parameter_cursor)
+        log.message('Scan complete.\n\n')
+
+    # assign min/max values
+    log.message('Minimum and maximum values assigned: min({0}), max({1})', min_attribute, max_attribute)
+    range_attribute = max_attribute - min_attribute
+    log.message('Range identified: {0}', range_attribute)
+    if width_mode == 'CONTINUOUS':
+        width_scale = WidthScale(min_attribute, max_attribute, min_width, max_width)
+    else:
+        # classify the primary attribute once, every point then finds its class by a sorted lookup
+        width_scale = ClassedWidthScale.from_method(
+            width_mode, int(number_of_breaks), min_width, max_width, values=values, min_value=min_attribute,
+            max_value=max_attribute, breaks=[float(value) for value in break_values.replace(',', ';').split(';')
+                                             if value.strip()])
+        break_dict = width_scale.break_dict()
+        log.message('{0} classes assigned:', len(break_dict))
+        for number, (upper, width) in sorted(break_dict.items()):
+            log.message('...class {0}: up to {1}, width {2}', number, upper, width)
+
+    # the stages turning the points into polygons
+    pipeline = Pipeline(width_scale, cap_type=cap_type, method=offset_method, spheroid=spheroid,
+                        width_factor=width_factor, output_geometry=output_geometry, tolerance=tolerance,
+                        value_tolerance=value_tolerance, geographic=sr.type == 'Geographic', log=log,
+                        instruments=instruments)
+
+    # an incremental run only processes the points appended since the previous run, as long as the
+    # attribute range and the settings the existing polygons were built with still hold
+    feature_class_output = os.path.splitext(output_polygons)[1].lower() not in SINKS
+    state_table = output_polygons + '_STATE'
+    settings = (float(min_attribute), float(max_attribute), float(min_width), float(max_width), cap_type,
+                offset_choice, float(simplify_tolerance) if simplify_tolerance else None, value_tolerance, width_mode,
+                '; '.join(str(upper) for upper, width in sorted(break_dict.values())) or None)
+    incremental = False
+    if update_mode == 'INCREMENTAL':
+        if not feature_class_output:
+            log.warning('Incremental updates require a feature class output, rebuilding the output.')
+            update_mode = 'REBUILD'
+        elif arcpy.Exists(output_polygons) and arcpy.Exists(state_table):
+            plan = read_plan(state_table)
+            incremental = plan.matches(settings)
+            if not incremental:
+                log.message('The attribute range or settings changed since the previous run, rebuilding the output.')
+        else:
+            log.message('No previous run found, building the output.')
+
+    if incremental:
+        # find the tracks that gained points since the previous run and remove their terminal segments
+        # before the insert cursor of the output is opened, update and insert cursors cannot be open on
+        # the same feature class at once outside an edit session
+        last_sorts = {}
+        with instruments.stage('scan', point_count), \
+                arcpy.da.SearchCursor(in_table=source_points, field_names=[case_field, sort_field]) as s_cursor:
+            for case, sort_value in s_cursor:
+                if case not in last_sorts or sort_value > last_sorts[case]:
+                    last_sorts[case] = sort_value
+        changed = set(case for case, last_sort in last_sorts.items() if plan.changed(case, last_sort))
+        restarts = dict((case, plan.restart(case)) for case in changed if plan.restart(case) is not None)
+        log.message('{0} of {1} tracks gained points, {2} of them new.', len(changed), len(last_sorts),
+                    len(changed) - len(restarts))
+        log.message('{0} terminal segments removed for rebuilding.', delete_restarted(output_polygons, restarts))
+
+    # create the output, open formats are chosen by the extension of the output and anything else
+    # is written as a feature class
+    output_name = os.path.basename(output_polygons)
+    if incremental:
+        log.message('Updating "{0}" with new points', output_name)
+        sink = FeatureClassSink(output_polygons, fields, sr, append=True)
+    else:
+        log.message('Creating "{0}" to store outputs', output_name)
+        log.message('...output spatial reference: {0}', sr.name)
+        if feature_class_output:
+            sink = FeatureClassSink(output_polygons, fields, sr)
+        else:
+            sink = open_sink(output_polygons, fields, srs_id=sr.factoryCode, srs_wkt=sr.exportToString())
+        log.message('Output created.')
+    states = {}
+
+    # the attributes of every segment of the track polygons go to a related table, joined on CASE_FIELD
+    segment_writer = None
+    if segment_table:
+        segment_writer = Writer(TableSink(segment_table, segment_fields), instruments=instruments,
+                                stage='write_segments')
+        log.message('Segment attributes written to "{0}".', os.path.basename(segment_table))
+
+    with Writer(sink, instruments=instruments) as writer:
+        if incremental:
+            # rebuild each changed track from its tail, writing only the segments from its restart point on
+            states = dict(plan.states)
+            log.start('Processing appended points...', point_count)
+            first_key = 0
+            appended = (row for row in search_points(source_points, point_fields, order_clause, sorter)
+                        if row[1] in changed and plan.include(row[1], row[2]))
+            # the cursor read is timed track by track, apart from the stages of each track
+            for case, rows in instruments.iterate('read', iter_tracks(appended), track_size):
+                track = pipeline.process_track(PointStore.from_rows(rows), writer, first_key=first_key,
+                                               restart=restarts.get(case))
+                states[case] = track_state(track.sort.tolist())
+                first_key += len(rows)
+            log.finish()
+
+        elif processing_mode == 'OVERLAPPED' and update_mode != 'INCREMENTAL':
+            # read batches of whole tracks while the previous batches are constructed and inserted, arcpy
+            # offsets and the offset cache are not shared across threads so they are solved on one thread
+            geometry_threads = int(worker_count) if worker_count else 2
+            if callable(offset_method):
+                geometry_threads = 1
+            log.start('Reading, constructing and inserting with {0} geometry threads...'.format(geometry_threads),
+                      point_count)
+            tracks = iter_tracks(search_points(source_points, point_fields, order_clause, sorter))
+            pipeline.process_overlapped(row_batches(tracks), writer, segment_writer, geometry_threads)
+            log.finish()
+            log.message('Input point features consumed.')
+
+        elif processing_mode in ('STREAMING', 'OVERLAPPED'):
+            # walk the ordered points one track at a time and emit its polygons before reading the next
+            # the overlapped mode streams too when the incremental state of every track is recorded
+            log.start('Streaming input point features track by track...', point_count)
+            first_key = 0
+            tracks = iter_tracks(search_points(source_points, point_fields, order_clause, sorter))
+            for case, rows in instruments.iterate('read', tracks, track_size):
+                track = pipeline.process_track(PointStore.from_rows(rows), writer, segment_writer, first_key)
+                if update_mode == 'INCREMENTAL':
+                    states[case] = track_state(track.sort.tolist())
+                first_key += len(rows)
+            log.finish()
+            log.message('Input point features consumed.')
 
+        else:
+            if points is None:
+                with instruments.stage('read', point_count):
+                    points = read_points(source_points, point_fields, order_clause, read_method, sorter)
+                log.message('Input point features consumed.')
+
+            if processing_mode == 'PARALLEL' and callable(offset_method):
+                # arcpy offsets cannot be shipped to worker processes
+                log.message('Geodesic offsets of projected inputs run through arcpy, constructing polygons in a single process.')
+                processing_mode = 'IN_MEMORY'
+
+            points, tracks = pipeline.process(points, writer, segment_writer, processing_mode == 'PARALLEL',
+                                              int(worker_count) if worker_count else None)
+            if update_mode == 'INCREMENTAL':
+                for case, track in points.tracks(tracks):
+                    states[case] = track_state(track.sort.tolist())
+
+    if sorter is not None and sorter.spilled:
+        log.message('The input was sorted in {0} chunks spilled to disk.', sorter.chunks)
+        instruments.count('sort_chunks', sorter.chunks)
+
+    # report how far simplification thinned the tracks, how much offset work the cache saved and the
+    # time of every stage
+    if profiler is not None:
+        profiler.stop()
+        log.message('Profile written to "{0}".', os.path.basename(profile_output))
+    pipeline.report()
+
+    # report the polygons the output rejected
+    log.message('{0} polygons written.', writer.written)
+    for line in writer.error_report():
+        log.warning(line)
+    if segment_writer is not None:
+        segment_writer.close()
+        log.message('{0} segment records written.', segment_writer.written)
+        for line in segment_writer.error_report():
+            log.warning(line)
+
+    # record where every track ended so the next incremental run can pick up from there
+    if update_mode == 'INCREMENTAL':
+        write_plan(state_table, states, settings, case_sort_dict['case_type'], case_sort_dict['sort_type'])
+        log.message('Track states recorded in "{0}".', os.path.basename(state_table))
+
+    # record the time and counters of every stage so runs can be compared across datasets
+    if run_summary:
+        instruments.write(run_summary, source=source_points, output=output_polygons, processing_mode=processing_mode,
+                          update_mode=update_mode, output_geometry=output_geometry, offset_method=offset_choice,
+                          width_mode=width_mode, polygons=writer.written, errors=len(writer.errors))
+        log.message('Run summary written to "{0}".', os.path.basename(run_summary))
@@ -0,0 +1,221 @@
+# benchmark of the widthify pipeline on synthetic tracks, runs without ArcGIS through stub_arcpy
+#
+#   python benchmarks/bench_widthify.py --tracks 100 --points 10000 --sink gpkg
+#
+# every stage of the tool is timed separately and reported with its throughput, peak memory is
+# traced in a second run of the stages
+import argparse
+import json
+import os
+import runpy
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import OrderedDict
+from contextlib import contextmanager
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS))
+sys.path.insert(0, BENCHMARKS)
+
+import stub_arcpy
+stub_arcpy.install()
+
+import arcpy
+import numpy as np
+from synthetic import FIELDS, generate_tracks
+from widthify import (GEODESIC, PLANAR, FeatureClassSink, MemorySink, OffsetCache, Pipeline, PointStore, WidthScale,
+                      Writer, open_sink, output_fields, scan_range)
+
+SOURCE = 'synthetic_points'
+SINK_EXTENSIONS = {'gpkg': '.gpkg', 'parquet': '.parquet', 'fgb': '.fgb'}
+
+
+class Stages(object):
+    # wall time and peak traced memory of each named stage
+    def __init__(self, measure_memory=True):
+        self.measure_memory = measure_memory
+        self.results = OrderedDict()
+
+    @contextmanager
+    def stage(self, name):
+        if self.measure_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            peak = None
+            if self.measure_memory:
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            self.results[name] = {'seconds': seconds, 'peak_bytes': peak}
+
+
+def open_output(sink_name, directory, fields, geographic):
+    if sink_name == 'memory':
+        return MemorySink(fields)
+    if sink_name == 'featureclass':
+        return FeatureClassSink(os.path.join(directory, 'polygons'), fields, stub_arcpy.SpatialReference(geographic))
+    return open_sink(os.path.join(directory, 'polygons' + SINK_EXTENSIONS[sink_name]), fields,
+                     srs_id=4326 if geographic else 32633)
+
+
+def stub_geodesic_offset(x, y, azimuth, distance):
+    # per vertex offsets through the arcpy geometry objects, as the tool does for GEODESIC projected inputs
+    out_x = np.empty(len(x))
+    out_y = np.empty(len(y))
+    for i in range(len(x)):
+        point = arcpy.PointGeometry(arcpy.Point(x[i], y[i])).pointFromAngleAndDistance(azimuth[i], distance[i])
+        out_x[i] = point.firstPoint.X
+        out_y[i] = point.firstPoint.Y
+    return out_x, out_y
+
+
+def offset_method(method, geographic):
+    # resolve a method parameter the way the tool does
+    if method == 'AUTO':
+        method = GEODESIC if geographic else PLANAR
+    if method == GEODESIC and not geographic:
+        return stub_geodesic_offset
+    return method
+
+
+def run_pipeline(cap_type, sink_name, geographic, measure_memory, directory, method='AUTO', tolerances=None,
+                 cache_size=0):
+    # time each stage of the in-memory pipeline the tool runs
+    stages = Stages(measure_memory)
+    point_fields = FIELDS
+    order_clause = (None, 'ORDER BY TRACK, SEQUENCE')
+
+    with stages.stage('attribute scan'):
+        # statistics pre-pass of the STREAMING and INCREMENTAL modes
+        with arcpy.da.SearchCursor(SOURCE, 'PRIMARY') as cursor:
+            min_attribute, max_attribute = scan_range(row[0] for row in cursor)
+
+    with stages.stage('point read'):
+        with arcpy.da.SearchCursor(SOURCE, point_fields, sql_clause=order_clause) as cursor:
+            points = PointStore.from_rows(cursor)
+
+    # the stages are those of the Pipeline the tool and the API run
+    method = offset_method(method, geographic)
+    if cache_size:
+        method = OffsetCache(method, size=cache_size)
+    pipeline = Pipeline(WidthScale(min_attribute, max_attribute, 2, 50), cap_type=cap_type, method=method,
+                        tolerance=tolerances[0] if tolerances else None,
+                        value_tolerance=tolerances[1] if tolerances else None, geographic=geographic)
+
+    if pipeline.simplifying:
+        with stages.stage('simplification'):
+            points = pipeline.simplify(points)
+
+    with stages.stage('width scaling'):
+        pipeline.scale(points)
+
+    with stages.stage('geometry construction'):
+        ribbons = pipeline.construct(points, points.track_index())
+    if cache_size:
+        stages.results['geometry construction'].update(cache_hits=method.hits, cache_misses=method.misses)
+
+    with stages.stage('insert'):
+        sink = open_output(sink_name, directory, output_fields('LONG', 'LONG'), geographic)
+        with Writer(sink) as writer:
+            pipeline.insert(writer, points, ribbons)
+    stages.results['point read']['store_bytes'] = points.nbytes
+    if tolerances:
+        stages.results['simplification']['kept_points'] = len(points)
+    return stages.results
+
+
+def run_tool(cap_type, directory, method='AUTO'):
+    # run WidthifyPointTrack.py end to end against the stub arcpy
+    stub_arcpy.parameters = [SOURCE, 'TRACK', 'SEQUENCE', 'PRIMARY', 'SECONDARY', '2', '50', cap_type,
+                             os.path.join(directory, 'tool_polygons'), '', '', '', '', 'QUIET', method]
+    start = time.perf_counter()
+    runpy.run_path(os.path.join(os.path.dirname(BENCHMARKS), 'WidthifyPointTrack.py'), run_name='__main__')
+    return time.perf_counter() - start
+
+
+def report(label, point_count, results):
+    print('\n{0}'.format(label))
+    print('{0:<24}{1:>12}{2:>16}{3:>14}'.format('stage', 'seconds', 'points/sec', 'peak MiB'))
+    total = 0
+    for name, result in results.items():
+        total += result['seconds']
+        peak = result['peak_bytes']
+        print('{0:<24}{1:>12.4f}{2:>16,.0f}{3:>14}'.format(
+            name, result['seconds'], point_count / result['seconds'] if result['seconds'] else 0,
+            '{0:.1f}'.format(peak / 1048576.0) if peak is not None else '-'))
+    print('{0:<24}{1:>12.4f}{2:>16,.0f}'.format('total', total, point_count / total if total else 0))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the widthify pipeline on synthetic tracks.')
+    parser.add_argument('--tracks', type=int, default=100, help='number of tracks')
+    parser.add_argument('--points', type=int, default=1000, help='points per track')
+    parser.add_argument('--projected', action='store_true', help='generate projected rather than geographic tracks')
+    parser.add_argument('--distribution', default='uniform', choices=['uniform', 'normal', 'lognormal', 'constant'],
+                        help='distribution of the primary attribute')
+    parser.add_argument('--duplicates', type=float, default=0.0, help='share of points repeating their position')
+    parser.add_argument('--single-point-tracks', type=int, default=0, help='extra tracks holding a single point')
+    parser.add_argument('--sink', default='memory', choices=['memory', 'featureclass', 'gpkg', 'parquet', 'fgb'],
+                        help='output written by the insert stage')
+    parser.add_argument('--method', default='AUTO', choices=['AUTO', 'PLANAR', 'GEODESIC'],
+                        help='offset method, AUTO offsets projected tracks in the plane')
+    parser.add_argument('--simplify', nargs=2, type=float, metavar=('TOLERANCE', 'VALUE_TOLERANCE'),
+                        help='simplify the tracks before construction, tolerance in metres for geographic tracks')
+    parser.add_argument('--offset-cache', type=int, default=0, metavar='SIZE',
+                        help='solve offsets through an offset cache holding this many vertices')
+    parser.add_argument('--caps', nargs='+', default=['BUTT', 'TAPER'], help='cap types to measure')
+    parser.add_argument('--no-memory', action='store_true', help='skip the second, memory traced, run of each stage')
+    parser.add_argument('--tool', action='store_true', help='also time WidthifyPointTrack.py end to end')
+    parser.add_argument('--json', help='write the results to this JSON file')
+    args = parser.parse_args(argv)
+
+    geographic = not args.projected
+    columns = generate_tracks(args.tracks, args.points, geographic, args.distribution, args.duplicates,
+                              args.single_point_tracks)
+    point_count = len(columns['OBJECTID'])
+    stub_arcpy.tables[SOURCE] = columns
+    stub_arcpy.field_types.update({'OBJECTID': 'OID', 'TRACK': 'Integer', 'SEQUENCE': 'Integer'})
+    stub_arcpy.spatial_references[SOURCE] = stub_arcpy.SpatialReference(geographic)
+
+    print('{0:,} points in {1:,} tracks, {2}, {3} primary values, {4} offsets, {5} sink'.format(
+        point_count, args.tracks + args.single_point_tracks, 'geographic' if geographic else 'projected',
+        args.distribution, args.method, args.sink))
+
+    summary = OrderedDict()
+    directory = tempfile.mkdtemp(prefix='widthify_bench_')
+    for cap_type in args.caps:
+        results = run_pipeline(cap_type, args.sink, geographic, False, directory, args.method, args.simplify,
+                               args.offset_cache)
+        if not args.no_memory:
+            # tracing allocations slows every stage down, so peak memory comes from a separate run
+            traced = run_pipeline(cap_type, args.sink, geographic, True, directory, args.method, args.simplify,
+                                  args.offset_cache)
+            for name, result in traced.items():
+                results[name]['peak_bytes'] = result['peak_bytes']
+        report(cap_type, point_count, results)
+        if args.simplify:
+            kept = results['simplification']['kept_points']
+            print('simplification kept {0:,} of {1:,} points, a reduction of {2:.1%}'.format(
+                kept, point_count, 1 - kept / float(point_count)))
+        if args.offset_cache:
+            construction = results['geometry construction']
+            print('offset cache {0:,} hits, {1:,} misses'.format(construction['cache_hits'],
+                                                                construction['cache_misses']))
+        summary[cap_type] = results
+        if args.tool:
+            seconds = run_tool(cap_type, directory, args.method)
+            print('{0:<24}{1:>12.4f}{2:>16,.0f}'.format('tool end to end', seconds, point_count / seconds))
+            summary[cap_type]['tool'] = {'seconds': seconds, 'peak_bytes': None}
+
+    if args.json:
+        with open(args.json, 'w') as json_file:
+            json.dump({'points': point_count, 'results': summary}, json_file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
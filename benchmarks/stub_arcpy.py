@@ -0,0 +1,201 @@
+# minimal in-memory stand-in for the parts of arcpy used by the tool so the pipeline can be
+# measured without ArcGIS, install() registers it as the arcpy module
+# tables maps a dataset path to a dict of columns, parameters holds the tool parameters and
+# keep_rows stores inserted rows in tables rather than only counting them
+import math
+import sys
+import tempfile
+import types
+
+tables = {}
+field_types = {}
+parameters = []
+inserted = {}
+keep_rows = False
+
+env = types.SimpleNamespace(overwriteOutput=False, scratchFolder=tempfile.gettempdir())
+
+
+class SpatialReference(object):
+    def __init__(self, geographic=True):
+        if geographic:
+            self.name = 'GCS_WGS_1984'
+            self.type = 'Geographic'
+            self.factoryCode = 4326
+        else:
+            self.name = 'WGS_1984_UTM_Zone_33N'
+            self.type = 'Projected'
+            self.factoryCode = 32633
+        self.semiMajorAxis = 6378137.0
+        self.flattening = 1 / 298.257223563
+        self.linearUnitName = '' if geographic else 'Meter'
+        self.metersPerUnit = 1.0
+
+    def exportToString(self):
+        return self.name
+
+    def __str__(self):
+        return self.name
+
+
+spatial_references = {}
+
+
+class Point(object):
+    def __init__(self, X=None, Y=None):
+        self.X = X
+        self.Y = Y
+
+
+class PointGeometry(object):
+    def __init__(self, point, spatial_reference=None):
+        self.firstPoint = point
+        self.spatialReference = spatial_reference
+
+    def pointFromAngleAndDistance(self, angle, distance, method='GEODESIC'):
+        # planar stand-in, close enough to time the per-vertex cost of the arcpy path
+        radians = math.radians(angle)
+        return PointGeometry(Point(self.firstPoint.X + distance * math.sin(radians),
+                                   self.firstPoint.Y + distance * math.cos(radians)), self.spatialReference)
+
+
+class Field(object):
+    def __init__(self, name, field_type):
+        self.name = name
+        self.type = field_type
+
+
+def GetParameterAsText(index):
+    return parameters[index] if index < len(parameters) else ''
+
+
+def AddMessage(message):
+    pass
+
+
+def AddWarning(message):
+    pass
+
+
+def SetProgressor(*args):
+    pass
+
+
+def SetProgressorPosition(*args):
+    pass
+
+
+def Describe(path):
+    return types.SimpleNamespace(spatialReference=spatial_references.get(path, SpatialReference()))
+
+
+def ListFields(path):
+    return [Field(name, field_types.get(name, 'Double')) for name in tables[path]]
+
+
+def _values(column):
+    return column.tolist() if hasattr(column, 'tolist') else list(column)
+
+
+def Exists(path):
+    return path in tables
+
+
+def GetCount_management(path):
+    columns = tables[path]
+    return [str(len(next(iter(columns.values()))) if columns else 0)]
+
+
+def CreateFeatureclass_management(out_path, out_name, **kwargs):
+    path = '{0}/{1}'.format(out_path, out_name)
+    tables[path] = {'SHAPE@': []}
+    inserted[path] = 0
+
+
+def CreateTable_management(out_path, out_name, **kwargs):
+    path = '{0}/{1}'.format(out_path, out_name)
+    tables[path] = {}
+    inserted[path] = 0
+
+
+def AddFields_management(in_table, field_description):
+    for field in field_description:
+        tables[in_table].setdefault(field[0], [])
+
+
+def _feature_class_to_numpy_array(in_table, field_names, where_clause=None, spatial_reference=None,
+                                  explode_to_points=False, skip_nulls=False, null_value=None):
+    import numpy as np
+    columns = tables[in_table]
+    return np.rec.fromarrays([np.asarray(columns[name]) for name in field_names], names=list(field_names))
+
+
+class _SearchCursor(object):
+    def __init__(self, in_table, field_names, where_clause=None, sql_clause=(None, None)):
+        columns = tables[in_table]
+        single = isinstance(field_names, str)
+        names = [field_names] if single else list(field_names)
+        rows = list(zip(*[_values(columns[name]) for name in names]))
+        if sql_clause and sql_clause[1] and sql_clause[1].upper().startswith('ORDER BY'):
+            order = [name.strip() for name in sql_clause[1][len('ORDER BY'):].split(',')]
+            keys = list(zip(*[_values(columns[name]) for name in order]))
+            rows = [row for key, row in sorted(zip(keys, rows), key=lambda pair: pair[0])]
+        self.rows = rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def __iter__(self):
+        return iter(self.rows)
+
+
+class _UpdateCursor(_SearchCursor):
+    def __init__(self, in_table, field_names, where_clause=None, sql_clause=(None, None)):
+        _SearchCursor.__init__(self, in_table, field_names, where_clause, sql_clause)
+        self.in_table = in_table
+        self.index = -1
+        self.deleted = set()
+
+    def __iter__(self):
+        for self.index, row in enumerate(self.rows):
+            yield row
+
+    def deleteRow(self):
+        self.deleted.add(self.index)
+
+    def __exit__(self, *args):
+        columns = tables[self.in_table]
+        for name in columns:
+            columns[name] = [value for i, value in enumerate(_values(columns[name])) if i not in self.deleted]
+
+
+class _InsertCursor(object):
+    # rows are only counted unless keep_rows is set, so the stub adds no memory to the insert stage
+    def __init__(self, in_table, field_names):
+        self.in_table = in_table
+        self.field_names = list(field_names)
+        inserted.setdefault(in_table, 0)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def insertRow(self, row):
+        inserted[self.in_table] += 1
+        if keep_rows:
+            columns = tables[self.in_table]
+            for name, value in zip(self.field_names, row):
+                columns[name].append(value)
+
+
+da = types.SimpleNamespace(SearchCursor=_SearchCursor, UpdateCursor=_UpdateCursor, InsertCursor=_InsertCursor,
+                           FeatureClassToNumPyArray=_feature_class_to_numpy_array)
+
+
+def install():
+    sys.modules['arcpy'] = sys.modules[__name__]
@@ -0,0 +1,61 @@
+import numpy as np
+
+# fields of the generated point tables, in the order the tool reads them
+FIELDS = ['OBJECTID', 'TRACK', 'SEQUENCE', 'PRIMARY', 'SECONDARY', 'SHAPE@X', 'SHAPE@Y']
+
+
+def generate_tracks(track_count=100, points_per_track=1000, geographic=True, distribution='uniform',
+                    duplicate_rate=0.0, single_point_tracks=0, shuffle=False, seed=0):
+    # random walk point tracks as a dict of columns keyed by FIELDS
+    # geographic tracks step around 10 m in decimal degrees, projected tracks around 10 m in metres
+    # duplicate_rate repeats the previous position of a track, single_point_tracks appends tracks
+    # holding a single point and shuffle returns the rows out of case/sort order
+    random = np.random.RandomState(seed)
+    counts = np.r_[np.full(track_count, points_per_track), np.ones(single_point_tracks, dtype=int)]
+    point_count = int(counts.sum())
+    case = np.repeat(np.arange(len(counts)), counts)
+    track_start = np.r_[0, np.cumsum(counts)[:-1]]
+    sequence = np.arange(point_count) - np.repeat(track_start, counts)
+
+    if geographic:
+        origin_x = random.uniform(-170, 170, len(counts))
+        origin_y = random.uniform(-60, 60, len(counts))
+        step = 1e-4
+    else:
+        origin_x = random.uniform(300000, 700000, len(counts))
+        origin_y = random.uniform(1000000, 9000000, len(counts))
+        step = 10.0
+
+    # wandering heading so tracks bend, steps of a duplicate position do not move
+    heading = np.cumsum(random.normal(0, 0.2, point_count))
+    step_x = step * np.sin(heading)
+    step_y = step * np.cos(heading)
+    duplicate = random.uniform(size=point_count) < duplicate_rate
+    step_x[duplicate] = 0
+    step_y[duplicate] = 0
+    step_x[track_start] = 0
+    step_y[track_start] = 0
+    walk_x = np.cumsum(step_x)
+    walk_y = np.cumsum(step_y)
+    # restart the walk at the origin of each track
+    x = origin_x[case] + walk_x - np.repeat(walk_x[track_start], counts)
+    y = origin_y[case] + walk_y - np.repeat(walk_y[track_start], counts)
+
+    if distribution == 'uniform':
+        primary = random.uniform(0, 100, point_count)
+    elif distribution == 'normal':
+        primary = random.normal(50, 15, point_count)
+    elif distribution == 'lognormal':
+        primary = random.lognormal(2, 1, point_count)
+    elif distribution == 'constant':
+        primary = np.full(point_count, 50.0)
+    else:
+        raise ValueError('Unknown distribution: {0}'.format(distribution))
+    secondary = random.uniform(0, 1, point_count)
+
+    columns = {'OBJECTID': np.arange(1, point_count + 1), 'TRACK': case, 'SEQUENCE': sequence,
+               'PRIMARY': primary, 'SECONDARY': secondary, 'SHAPE@X': x, 'SHAPE@Y': y}
+    if shuffle:
+        order = random.permutation(point_count)
+        columns = dict((name, values[order]) for name, values in columns.items())
+    return columns
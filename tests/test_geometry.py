@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from widthify import BUTT, PLANAR, TAPER, build_ribbons, build_track_ribbons, find_angles, geodesic_offset
+
+
+def straight_track():
+    # three points heading north with a half-width of one unit
+    return np.zeros(3), np.arange(3.0), np.ones(3), np.zeros(3, dtype=np.int32)
+
+
+def test_find_angles_clockwise_from_north():
+    assert find_angles([0, 0, 0], [0, 0, 0], [0, 1, -1], [1, 0, 0]).tolist() == [0, 90, -90]
+
+
+def test_butt_segment_vertices():
+    ribbons = build_ribbons(*straight_track(), cap_type=BUTT, method=PLANAR)
+    assert ribbons.start.tolist() == [0, 1]
+    assert np.allclose(list(ribbons.rings())[0], [(1, 0), (-1, 0), (-1, 1), (1, 1)])
+    assert np.allclose(list(ribbons.rings())[1], [(1, 1), (-1, 1), (-1, 2), (1, 2)])
+
+
+def test_taper_segment_vertices():
+    rings = list(build_ribbons(*straight_track(), cap_type=TAPER, method=PLANAR).rings())
+    assert np.allclose(rings[0], [(0, 0), (-1, 1), (1, 1)])
+    assert np.allclose(rings[1], [(0, 2), (-1, 1), (1, 1)])
+
+
+def test_segments_do_not_cross_tracks():
+    x, y, half_widths, cases = np.zeros(5), np.arange(5.0), np.ones(5), np.array([0, 0, 1, 2, 2])
+    assert build_ribbons(x, y, half_widths, cases, method=PLANAR).start.tolist() == [0, 3]
+
+
+def test_track_polygon_of_a_straight_track():
+    ribbons = build_track_ribbons(*straight_track(), cap_type=BUTT, method=PLANAR)
+    assert len(ribbons) == 1
+    assert np.allclose(list(ribbons.rings())[0], [(-1, 0), (-1, 1), (-1, 2), (1, 2), (1, 1), (1, 0)])
+
+
+def test_geodesic_offset_along_the_equator():
+    lon, lat = geodesic_offset(np.array([0.0]), np.array([0.0]), np.array([90.0]), np.array([111319.49]))
+    assert np.allclose(lon, 1.0, atol=1e-6) and np.allclose(lat, 0.0, atol=1e-9)
+
+
+def test_track_polygon_skips_repeated_positions():
+    x, y, half_widths, cases = straight_track()
+    repeated = build_track_ribbons(x[[0, 1, 1, 2, 2]], y[[0, 1, 1, 2, 2]], half_widths[[0, 1, 1, 2, 2]],
+                                   np.zeros(5, dtype=np.int32), cap_type=BUTT, method=PLANAR)
+    assert repeated.start.tolist() == [0] and repeated.end.tolist() == [5]
+    assert np.allclose(repeated.vertices, build_track_ribbons(x, y, half_widths, cases, method=PLANAR).vertices)
+
+
+def test_track_polygon_of_repeated_positions_only():
+    ribbons = build_track_ribbons(np.ones(3), np.ones(3), np.ones(3), np.zeros(3), method=PLANAR)
+    assert len(ribbons) == 0
+
+
+def test_track_polygon_of_a_track_crossing_itself():
+    # the ring follows the track across itself and is left self-intersecting
+    geometry = pytest.importorskip('shapely.geometry')
+    x, y = np.array([0.0, 10, 10, 5, 5]), np.array([0.0, 0, 5, 5, -5])
+    ribbons = build_track_ribbons(x, y, np.full(5, 0.5), np.zeros(5), cap_type=BUTT, method=PLANAR)
+    assert len(ribbons) == 1
+    assert not geometry.Polygon(list(ribbons.rings())[0]).is_valid
@@ -0,0 +1,31 @@
+import threading
+import time
+
+import pytest
+
+from widthify import Overlapped
+
+
+def test_results_wait_for_a_slow_first_batch_within_depth():
+    written = []
+
+    def compute(batch):
+        if batch == 0:
+            time.sleep(0.3)
+        return batch
+
+    overlapped = Overlapped(compute, written.append, workers=4, depth=3)
+    overlapped.run(iter(range(40)))
+    assert written == list(range(40))
+    assert 0 < overlapped.max_pending <= 3
+
+
+def test_failure_stops_every_stage():
+    def compute(batch):
+        if batch == 5:
+            raise RuntimeError('broken batch')
+        return batch
+
+    with pytest.raises(RuntimeError, match='broken batch'):
+        Overlapped(compute, lambda result: None, workers=2, depth=2).run(iter(range(100)))
+    assert not [thread for thread in threading.enumerate() if thread.name.startswith('widthify-')]
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from widthify import PLANAR, TRACKS, MemorySink, Pipeline, WidthScale, Writer, from_columns, widthify
+
+
+def points(cases):
+    # points stepping north along each track, with a primary value rising along the input
+    count = len(cases)
+    return from_columns({'case': np.asarray(cases), 'sort': np.arange(count), 'value': np.arange(count, dtype=float),
+                         'x': np.zeros(count), 'y': np.arange(count, dtype=float)}, 'case', 'sort', 'value')
+
+
+def run(store, **settings):
+    sink = MemorySink()
+    pipeline = Pipeline(WidthScale(0, 10, 2, 12), method=PLANAR, **settings)
+    with Writer(sink) as writer:
+        pipeline.process(store, writer)
+    return sink.records, pipeline
+
+
+def test_a_polygon_per_segment():
+    records, pipeline = run(points([1, 1, 1, 2, 3, 3]))
+    assert len(records) == 3
+    assert [record[1] for record in records] == [1, 1, 3]
+    assert pipeline.instruments.counters['skipped_points'] == 1
+    assert pipeline.instruments.counters['polygons'] == 3
+
+
+def test_a_polygon_per_track():
+    records, pipeline = run(points([1, 1, 1, 2, 3, 3]), output_geometry=TRACKS)
+    assert [(record[1], record[4]) for record in records] == [(1, 3), (3, 2)]
+
+
+def test_segments_of_null_values_are_skipped():
+    store = points([1, 1, 1, 1])
+    store.primary[1] = np.nan
+    records, pipeline = run(store)
+    assert [record[0] for record in records] == [3]
+    assert all(np.isfinite(vertex).all() for record in records for vertex in record[-1])
+    assert pipeline.instruments.counters['null_values'] == 1
+    assert pipeline.instruments.counters['skipped_segments'] == 2
+
+
+def test_track_polygons_join_around_null_values():
+    store = points([1, 1, 1, 1])
+    store.primary[1] = np.nan
+    records, pipeline = run(store, output_geometry=TRACKS)
+    assert [record[4] for record in records] == [3]
+    assert all(np.isfinite(vertex).all() for record in records for vertex in record[-1])
+    assert pipeline.instruments.counters['skipped_segments'] == 2
+
+
+def test_null_case_values_ordered_first():
+    store = points(['b', None, 'a', None])
+    assert store.case_values.tolist() == [None, 'a', 'b']
+    assert store.case_code.tolist() == [0, 0, 1, 2]
+    assert store.oid.tolist() == [2, 4, 3, 1]
+
+
+def test_empty_input_raises():
+    with pytest.raises(ValueError, match='no points'):
+        widthify({'case': [], 'sort': [], 'value': [], 'x': [], 'y': []}, 'case', 'sort', 'value')
+
+
+def test_null_primary_values_without_a_range_raise():
+    columns = {'case': [1, 1], 'sort': [1, 2], 'speed': [None, None], 'x': [0.0, 0.0], 'y': [0.0, 1.0]}
+    with pytest.raises(ValueError, match='Every speed value is null'):
+        widthify(columns, 'case', 'sort', 'speed')
+    assert widthify(columns, 'case', 'sort', 'speed', min_value=0, max_value=10)['polygons'] == 0
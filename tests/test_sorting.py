@@ -0,0 +1,44 @@
+import datetime
+
+import numpy as np
+
+from widthify import ExternalSort
+
+
+def rows(count, seed=0):
+    # (oid, case, sort, primary, secondary, x, y) rows in no particular order, a few tracks long
+    rng = np.random.default_rng(seed)
+    cases = rng.integers(0, 7, count)
+    sorts = rng.permutation(count)
+    return [(oid, int(case), int(sort), float(oid), None, 0.0, float(sort))
+            for oid, (case, sort) in enumerate(zip(cases.tolist(), sorts.tolist()))]
+
+
+def test_single_chunk_is_sorted_in_memory():
+    source = rows(200)
+    sorter = ExternalSort(chunk_points=1000)
+    ordered = list(sorter.sort(source))
+    assert not sorter.spilled
+    expected = np.lexsort(([row[2] for row in source], [row[1] for row in source]))
+    assert [row[0] for row in ordered] == expected.tolist()
+
+
+def test_spilled_chunks_merge_in_order(tmp_path):
+    source = rows(1000)
+    sorter = ExternalSort(chunk_points=64, directory=str(tmp_path))
+    ordered = list(sorter.sort(source))
+    assert sorter.spilled and sorter.chunks == 16
+    expected = np.lexsort(([row[2] for row in source], [row[1] for row in source]))
+    assert [row[0] for row in ordered] == expected.tolist()
+    assert all(np.isnan(row[4]) for row in ordered)
+    assert not list(tmp_path.iterdir())
+
+
+def test_nulls_are_ordered_first_across_chunks(tmp_path):
+    day = datetime.datetime(2024, 1, 1)
+    source = [(1, 'b', day, 1.0, 1.0, 0.0, 0.0), (2, None, None, 1.0, 1.0, 0.0, 0.0),
+              (3, 'a', None, 1.0, 1.0, 0.0, 0.0), (4, 'a', day, 1.0, 1.0, 0.0, 0.0),
+              (5, None, day, 1.0, 1.0, 0.0, 0.0)]
+    ordered = list(ExternalSort(chunk_points=2, directory=str(tmp_path)).sort(source))
+    assert [(row[0], row[1], row[2]) for row in ordered] == [(2, None, None), (5, None, day), (3, 'a', None),
+                                                             (4, 'a', day), (1, 'b', day)]
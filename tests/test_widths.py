@@ -0,0 +1,32 @@
+import numpy as np
+
+from widthify import (EQUAL_INTERVAL, MANUAL, QUANTILE, ClassedWidthScale, WidthScale, equal_interval_breaks,
+                      jenks_breaks, quantile_breaks)
+
+
+def test_continuous_widths_stretch_over_the_range():
+    scale = WidthScale(0, 10, 2, 12)
+    assert scale.widths([0, 5, 10]).tolist() == [2, 7, 12]
+    assert scale.half_widths([0, 10]).tolist() == [1, 6]
+
+
+def test_continuous_widths_of_a_constant_attribute_are_the_minimum():
+    assert WidthScale(3, 3, 2, 12).widths([3, 3]).tolist() == [2, 2]
+
+
+def test_classes_by_upper_break():
+    scale = ClassedWidthScale([10, 20, 30], 2, 6)
+    assert scale.classes([5, 10, 15, 35, np.nan]).tolist() == [1, 1, 2, 3, 0]
+    assert scale.widths([5, 15, 30]).tolist() == [2, 4, 6]
+    assert np.isnan(scale.widths([np.nan])[0])
+    assert scale.break_dict() == {1: (10.0, 2.0), 2: (20.0, 4.0), 3: (30.0, 6.0)}
+
+
+def test_break_methods():
+    assert equal_interval_breaks(0, 10, 4) == [2.5, 5.0, 7.5, 10.0]
+    assert quantile_breaks([1, 2, 3, 4, np.nan], 2) == [2.5, 4.0]
+    assert jenks_breaks([1, 1.1, 1.2, 10, 10.1, 10.2], 2) == [1.2, 10.2]
+    assert ClassedWidthScale.from_method(EQUAL_INTERVAL, 2, 2, 4, min_value=0, max_value=10).breaks.tolist() == \
+        [5, 10]
+    assert ClassedWidthScale.from_method(QUANTILE, 2, 2, 4, values=[1, 2, 3, 4]).breaks.tolist() == [2.5, 4]
+    assert ClassedWidthScale.from_method(MANUAL, 0, 2, 4, breaks=[3, 1]).breaks.tolist() == [1, 3]
@@ -0,0 +1,20 @@
+# core components of the Widthify Points tool
+from .widths import (EQUAL_INTERVAL, QUANTILE, JENKS, MANUAL, ClassedWidthScale, WidthScale, equal_interval_breaks,
+                     jenks_breaks, quantile_breaks)
+from .geometry import (BUTT, TAPER, PLANAR, GEODESIC, WGS84, MITER_LIMIT, Ribbons, TrackRibbons, build_ribbons,
+                       build_track_ribbons, find_angles, geodesic_offset, offset_points, planar_offset)
+from .tracks import TrackIndex, iter_tracks, scan_range
+from .parallel import build_ribbons_parallel, chunk_tracks
+from .progress import QUIET, NORMAL, VERBOSE, TRACE, Progress
+from .writers import (SINKS, CsvSink, FeatureClassSink, FlatGeobufSink, GeoPackageSink, GeoParquetSink, MemorySink,
+                      TableSink, Writer, open_sink, output_fields, polygon_wkb, polygon_wkt, track_fields)
+from .incremental import IncrementalPlan, track_state
+from .store import PointStore
+from .simplify import metric_coordinates, simplify_track, simplify_tracks
+from .cache import OffsetCache
+from .instrument import Instruments, RunProfiler, TimedCall
+from .overlap import Overlapped, StageQueue, row_batches, store_batches
+from .pipeline import SEGMENTS, TRACKS, Pipeline, segment_records, track_extremes, track_records
+from .api import widthify
+from .sorting import ExternalSort
+from .sources import from_columns, read_source
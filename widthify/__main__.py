@@ -0,0 +1,75 @@
+# command line entry point, python -m widthify points.csv polygons.gpkg --case TRACK --sort TIME --primary SPEED
+import argparse
+import json
+import sys
+
+from .api import widthify
+from .geometry import BUTT, TAPER
+from .pipeline import SEGMENTS, TRACKS
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='widthify',
+                                     description='Build polygons of varying width from ordered track points.')
+    parser.add_argument('input', help='CSV, GeoPackage or Parquet file of points')
+    parser.add_argument('output', help='GeoPackage, Parquet, FlatGeobuf or CSV file receiving the polygons')
+    parser.add_argument('--case', required=True, help='field separating the tracks')
+    parser.add_argument('--sort', required=True, help='field ordering the points of a track')
+    parser.add_argument('--primary', required=True, help='field the polygon width is scaled by')
+    parser.add_argument('--secondary', help='field carried over to the polygons')
+    parser.add_argument('--min-width', type=float, default=2, help='minimum polygon width in metres')
+    parser.add_argument('--max-width', type=float, default=50, help='maximum polygon width in metres')
+    parser.add_argument('--cap', default=BUTT, choices=[BUTT, TAPER], help='end cap of each track')
+    parser.add_argument('--geometry', default=SEGMENTS, choices=[SEGMENTS, TRACKS],
+                        help='a polygon per segment or a single polygon per track')
+    parser.add_argument('--method', default='AUTO', choices=['AUTO', 'PLANAR', 'GEODESIC'],
+                        help='offset method, AUTO offsets geographic points geodesically and projected ones in the plane')
+    coordinates = parser.add_mutually_exclusive_group()
+    coordinates.add_argument('--geographic', dest='geographic', action='store_true', default=None,
+                             help='coordinates are longitude and latitude')
+    coordinates.add_argument('--projected', dest='geographic', action='store_false',
+                             help='coordinates are projected')
+    parser.add_argument('--metres-per-unit', type=float, default=1.0, help='metres per unit of projected coordinates')
+    parser.add_argument('--srs-id', type=int, help='EPSG code recorded with the output')
+    parser.add_argument('--x', default='x', help='x coordinate field of CSV and Parquet inputs')
+    parser.add_argument('--y', default='y', help='y coordinate field of CSV and Parquet inputs')
+    modes = parser.add_mutually_exclusive_group()
+    modes.add_argument('--parallel', action='store_true', help='construct the polygons across worker processes')
+    modes.add_argument('--overlapped', action='store_true',
+                       help='construct the polygons on threads while the previous ones are written')
+    parser.add_argument('--workers', type=int,
+                        help='number of worker processes, or of geometry threads when overlapped')
+    parser.add_argument('--min-value', type=float, help='known minimum of the primary attribute')
+    parser.add_argument('--max-value', type=float, help='known maximum of the primary attribute')
+    parser.add_argument('--width-mode', default='CONTINUOUS',
+                        choices=['CONTINUOUS', 'EQUAL_INTERVAL', 'QUANTILE', 'JENKS', 'MANUAL'],
+                        help='continuous widths or widths by class of the primary attribute')
+    parser.add_argument('--breaks', type=int, default=5, help='number of classes of the classed width modes')
+    parser.add_argument('--break-values', type=float, nargs='+', help='class upper bounds of the MANUAL width mode')
+    parser.add_argument('--tolerance', type=float, help='spatial simplification tolerance in metres')
+    parser.add_argument('--value-tolerance', type=float, help='primary attribute simplification tolerance')
+    parser.add_argument('--verbosity', default='NORMAL', choices=['QUIET', 'NORMAL', 'VERBOSE', 'TRACE'])
+    parser.add_argument('--json', action='store_true', help='print the run summary as JSON')
+    parser.add_argument('--summary', help='JSON file receiving the time and counters of every stage of the run')
+    parser.add_argument('--profile', help='profile of the run, pyinstrument output for .html and .txt files '
+                                          'and cProfile statistics otherwise')
+    args = parser.parse_args(argv)
+
+    processing_mode = 'PARALLEL' if args.parallel else 'OVERLAPPED' if args.overlapped else 'IN_MEMORY'
+    summary = widthify(args.input, args.case, args.sort, args.primary, args.secondary, min_width=args.min_width,
+                       max_width=args.max_width, output=args.output, cap_type=args.cap, output_geometry=args.geometry,
+                       method=args.method, geographic=args.geographic, srs_id=args.srs_id,
+                       metres_per_unit=args.metres_per_unit,
+                       processing_mode=processing_mode, workers=args.workers,
+                       min_value=args.min_value, max_value=args.max_value, width_mode=args.width_mode,
+                       number_of_breaks=args.breaks, break_values=args.break_values, tolerance=args.tolerance,
+                       value_tolerance=args.value_tolerance, x_field=args.x, y_field=args.y,
+                       verbosity=args.verbosity, emit=lambda message: print(message, file=sys.stderr),
+                       summary_path=args.summary, profile_path=args.profile)
+    if args.json:
+        print(json.dumps(summary, indent=2, default=str))
+    return 1 if summary['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,134 @@
+import numpy as np
+
+from .geometry import BUTT, GEODESIC, PLANAR
+from .overlap import store_batches
+from .instrument import Instruments, RunProfiler
+from .pipeline import SEGMENTS, TRACKS, Pipeline
+from .progress import QUIET, Progress
+from .sources import field_type, from_columns, read_source
+from .store import PointStore
+from .widths import ClassedWidthScale, WidthScale
+from .writers import MemorySink, Writer, open_sink, output_fields, track_fields
+
+
+def looks_geographic(points):
+    # whether every coordinate falls within the range of longitudes and latitudes
+    return bool(len(points)) and bool(np.all(np.abs(points.x) <= 180) and np.all(np.abs(points.y) <= 90))
+
+
+def widthify(points, case_field, sort_field, primary_field, secondary_field=None, min_width=2, max_width=50,
+             output=None, cap_type=BUTT, output_geometry=SEGMENTS, method='AUTO', geographic=None, srs_id=None,
+             metres_per_unit=1.0, processing_mode='IN_MEMORY', workers=None, min_value=None, max_value=None,
+             width_mode='CONTINUOUS', number_of_breaks=5, break_values=None, tolerance=None, value_tolerance=None,
+             x_field='x', y_field='y', verbosity=QUIET, emit=print, summary_path=None, profile_path=None):
+    # build the polygons of a set of ordered points without arcpy
+    #
+    # points is the path of a CSV, GeoPackage or Parquet file, a mapping of column names to arrays or
+    # a PointStore already ordered by case and sort, the field names select the columns of the first two
+    # output is the path of a .gpkg, .parquet, .fgb or .csv file, or None to return the polygon records
+    # coordinates are taken as geographic when every point lies within longitude and latitude bounds,
+    # unless geographic says otherwise, widths and tolerances are in metres and projected coordinates
+    # are in units of metres_per_unit
+    # summary_path receives the run summary with the time of every stage as JSON and profile_path a
+    # profile of the run, see RunProfiler
+    # returns a summary of the run
+    settings = dict(locals())
+    del settings['profile_path']
+    if profile_path is None:
+        return _widthify(**settings)
+    with RunProfiler(profile_path):
+        return _widthify(**settings)
+
+
+def _widthify(points, case_field, sort_field, primary_field, secondary_field, min_width, max_width, output,
+              cap_type, output_geometry, method, geographic, srs_id, metres_per_unit, processing_mode, workers,
+              min_value, max_value, width_mode, number_of_breaks, break_values, tolerance, value_tolerance,
+              x_field, y_field, verbosity, emit, summary_path):
+    log = Progress(emit=emit, level=verbosity)
+    instruments = Instruments()
+    case_type = sort_type = None
+    with instruments.stage('read') as read:
+        if isinstance(points, PointStore):
+            pass
+        elif isinstance(points, str):
+            points, source_srs, case_type, sort_type = read_source(points, case_field, sort_field, primary_field,
+                                                                  secondary_field, x_field, y_field)
+            srs_id = source_srs if srs_id is None else srs_id
+        else:
+            points = from_columns(points, case_field, sort_field, primary_field, secondary_field, x_field, y_field)
+        read['items'] = len(points)
+    log.message('{0} points read.', len(points))
+    if not len(points):
+        raise ValueError('The input holds no points')
+    if case_type is None:
+        case_type = field_type([value for value in points.case_values.tolist() if value is not None])
+        sort_type = field_type(points.sort)
+
+    # offsets follow the spheroid for geographic coordinates and the plane otherwise
+    if geographic is None:
+        geographic = looks_geographic(points)
+    if method == 'AUTO':
+        method = GEODESIC if geographic else PLANAR
+    if method == GEODESIC and not geographic:
+        raise ValueError('Geodesic offsets of projected coordinates require the ArcGIS toolbox')
+    width_factor = 1.0 / metres_per_unit if method == PLANAR and not geographic else 1.0
+    if tolerance is not None and not geographic:
+        tolerance = tolerance / metres_per_unit
+
+    # widths are stretched over the range of the primary attribute, or stepped by class
+    if min_value is None or max_value is None:
+        min_value, max_value = points.value_range()
+        if min_value is None:
+            raise ValueError('Every {0} value is null, give min_value and max_value'.format(primary_field))
+    if width_mode == 'CONTINUOUS':
+        width_scale = WidthScale(min_value, max_value, min_width, max_width)
+    else:
+        width_scale = ClassedWidthScale.from_method(width_mode, number_of_breaks, min_width, max_width,
+                                                    values=points.primary, min_value=min_value, max_value=max_value,
+                                                    breaks=break_values)
+
+    pipeline = Pipeline(width_scale, cap_type=cap_type, method=method, width_factor=width_factor,
+                        output_geometry=output_geometry, tolerance=tolerance, value_tolerance=value_tolerance,
+                        geographic=geographic, log=log, instruments=instruments)
+    if output_geometry == TRACKS:
+        fields = track_fields(case_type, sort_type)
+    else:
+        fields = output_fields(case_type, sort_type)
+    if output is None:
+        sink = MemorySink(fields)
+    else:
+        sink = open_sink(output, fields, srs_id=srs_id or (4326 if geographic else 0))
+
+    with Writer(sink, instruments=instruments) as writer:
+        if processing_mode == 'OVERLAPPED':
+            # the points are already in memory, so construction overlaps the writes of the previous batch
+            pipeline.process_overlapped(store_batches(points), writer, workers=workers or 2)
+            kept_points, track_count = instruments.counters.get('points', 0), instruments.counters.get('tracks', 0)
+        else:
+            points, tracks = pipeline.process(points, writer, parallel=processing_mode == 'PARALLEL',
+                                              workers=workers)
+            kept_points, track_count = len(points), len(tracks)
+    pipeline.report()
+    log.message('{0} polygons written.', writer.written)
+    for line in writer.error_report():
+        log.warning(line)
+
+    summary = {
+        'points': pipeline.simplified['read'] or len(points),
+        'kept_points': kept_points,
+        'tracks': track_count,
+        'polygons': writer.written,
+        'errors': writer.error_report(),
+        'fields': [field[0] for field in fields]
+    }
+    if isinstance(width_scale, ClassedWidthScale):
+        summary['breaks'] = width_scale.break_dict()
+    summary['instruments'] = instruments.summary()
+    if summary_path is not None:
+        instruments.write(summary_path, processing_mode=processing_mode, output_geometry=output_geometry,
+                          method=method, width_mode=width_mode, polygons=writer.written,
+                          errors=len(writer.errors))
+        log.message('Run summary written to "{0}".', summary_path)
+    if output is None:
+        summary['records'] = sink.records
+    return summary
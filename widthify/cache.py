@@ -0,0 +1,74 @@
+from collections import OrderedDict
+
+import numpy as np
+
+from .geometry import GEODESIC, WGS84, offset_points
+
+
+class OffsetCache(object):
+    # bounded least recently used cache of offset vertices, usable as the offset method of the builders
+    # inputs are keyed on their coordinates, bearing and distance rounded to the given decimals, so
+    # stationary fixes and duplicate positions are solved once and reused
+    # hits counts the offsets answered without solving, including repeats within a single batch
+    def __init__(self, method=GEODESIC, spheroid=WGS84, size=100000, coordinate_decimals=9, bearing_decimals=6,
+                 distance_decimals=6):
+        self.method = method
+        self.spheroid = spheroid
+        self.size = size
+        self.decimals = (coordinate_decimals, coordinate_decimals, bearing_decimals, distance_decimals)
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __call__(self, x, y, azimuth, distance):
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        azimuth = np.broadcast_to(np.asarray(azimuth, dtype=np.float64), x.shape)
+        distance = np.broadcast_to(np.asarray(distance, dtype=np.float64), x.shape)
+        out_x = np.empty(len(x))
+        out_y = np.empty(len(x))
+        if not len(x):
+            return out_x, out_y
+
+        # collapse repeated inputs within the batch before looking them up
+        quantized = np.column_stack([np.round(column, decimals) for column, decimals in
+                                     zip((x, y, azimuth, distance), self.decimals)])
+        keys, first, inverse = np.unique(quantized, axis=0, return_index=True, return_inverse=True)
+        inverse = inverse.ravel()
+        unique_x = np.empty(len(keys))
+        unique_y = np.empty(len(keys))
+
+        missing = []
+        for position, key in enumerate(map(tuple, keys.tolist())):
+            entry = self.entries.get(key)
+            if entry is None:
+                missing.append(position)
+            else:
+                self.entries.move_to_end(key)
+                unique_x[position], unique_y[position] = entry
+
+        # solve the missing offsets in a single batch from the first input of each key
+        if missing:
+            missing = np.array(missing)
+            source = first[missing]
+            solved_x, solved_y = offset_points(x[source], y[source], azimuth[source], distance[source], self.method,
+                                               self.spheroid)
+            unique_x[missing] = solved_x
+            unique_y[missing] = solved_y
+            for key, vertex in zip(map(tuple, keys[missing].tolist()), zip(solved_x.tolist(), solved_y.tolist())):
+                self.entries[key] = vertex
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+        self.misses += len(missing)
+        self.hits += len(x) - len(missing)
+        out_x[:] = unique_x[inverse]
+        out_y[:] = unique_y[inverse]
+        return out_x, out_y
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / float(lookups) if lookups else 0.0
@@ -0,0 +1,285 @@
+import numpy as np
+
+from .tracks import TrackIndex
+
+# cap types for the ends of each track
+BUTT = 'BUTT'
+TAPER = 'TAPER'
+
+# methods used to place the offset vertices
+PLANAR = 'PLANAR'
+GEODESIC = 'GEODESIC'
+
+# ratio of the miter length to the half-width beyond which the outside of a bend is bevelled
+MITER_LIMIT = 2.0
+
+# semi-major axis and flattening of the WGS 1984 spheroid
+WGS84 = (6378137.0, 1 / 298.257223563)
+
+
+def find_angles(x1, y1, x2, y2):
+    # azimuth in degrees clockwise from north of the line between each pair of points
+    dx = np.asarray(x2, dtype=np.float64) - x1
+    dy = np.asarray(y2, dtype=np.float64) - y1
+    return np.degrees(np.arctan2(dx, dy))
+
+
+def planar_offset(x, y, azimuth, distance):
+    # move each point along its azimuth by distance in the units of the coordinates
+    radians = np.radians(azimuth)
+    return x + distance * np.sin(radians), y + distance * np.cos(radians)
+
+
+def geodesic_offset(lon, lat, azimuth, distance, spheroid=WGS84):
+    # solve the direct geodesic problem (Vincenty) for every point at once
+    # lon/lat are in degrees and distance in metres along the spheroid
+    semi_major, flattening = spheroid
+    semi_minor = semi_major * (1 - flattening)
+
+    alpha1 = np.radians(azimuth)
+    sin_alpha1 = np.sin(alpha1)
+    cos_alpha1 = np.cos(alpha1)
+
+    # reduced latitude of the start points
+    tan_u1 = (1 - flattening) * np.tan(np.radians(lat))
+    cos_u1 = 1 / np.sqrt(1 + tan_u1 ** 2)
+    sin_u1 = tan_u1 * cos_u1
+
+    sigma1 = np.arctan2(tan_u1, cos_alpha1)
+    sin_alpha = cos_u1 * sin_alpha1
+    cos_sq_alpha = 1 - sin_alpha ** 2
+    u_sq = cos_sq_alpha * (semi_major ** 2 - semi_minor ** 2) / semi_minor ** 2
+    a = 1 + u_sq / 16384 * (4096 + u_sq * (-768 + u_sq * (320 - 175 * u_sq)))
+    b = u_sq / 1024 * (256 + u_sq * (-128 + u_sq * (74 - 47 * u_sq)))
+
+    # iterate the angular distance on the auxiliary sphere until every point has converged
+    first_sigma = distance / (semi_minor * a)
+    sigma = first_sigma
+    for _ in range(100):
+        cos_2sigma_m = np.cos(2 * sigma1 + sigma)
+        sin_sigma = np.sin(sigma)
+        cos_sigma = np.cos(sigma)
+        delta_sigma = b * sin_sigma * (cos_2sigma_m + b / 4 * (
+            cos_sigma * (-1 + 2 * cos_2sigma_m ** 2) -
+            b / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma ** 2) * (-3 + 4 * cos_2sigma_m ** 2)))
+        next_sigma = first_sigma + delta_sigma
+        converged = np.all(np.abs(next_sigma - sigma) < 1e-12)
+        sigma = next_sigma
+        if converged:
+            break
+
+    cos_2sigma_m = np.cos(2 * sigma1 + sigma)
+    sin_sigma = np.sin(sigma)
+    cos_sigma = np.cos(sigma)
+
+    tmp = sin_u1 * sin_sigma - cos_u1 * cos_sigma * cos_alpha1
+    lat2 = np.arctan2(sin_u1 * cos_sigma + cos_u1 * sin_sigma * cos_alpha1,
+                      (1 - flattening) * np.sqrt(sin_alpha ** 2 + tmp ** 2))
+    lam = np.arctan2(sin_sigma * sin_alpha1, cos_u1 * cos_sigma - sin_u1 * sin_sigma * cos_alpha1)
+    c = flattening / 16 * cos_sq_alpha * (4 + flattening * (4 - 3 * cos_sq_alpha))
+    lon_delta = lam - (1 - c) * flattening * sin_alpha * (
+        sigma + c * sin_sigma * (cos_2sigma_m + c * cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)))
+
+    lon2 = (np.asarray(lon, dtype=np.float64) + np.degrees(lon_delta) + 180) % 360 - 180
+    return lon2, np.degrees(lat2)
+
+
+def offset_points(x, y, azimuth, distance, method=GEODESIC, spheroid=WGS84):
+    # dispatch to the requested offset method
+    # a callable taking (x, y, azimuth, distance) arrays may be supplied in place of a method name
+    if callable(method):
+        return method(x, y, azimuth, distance)
+    if method == PLANAR:
+        return planar_offset(x, y, azimuth, distance)
+    if method == GEODESIC:
+        return geodesic_offset(x, y, azimuth, distance, spheroid)
+    raise ValueError('Unknown offset method: {0}'.format(method))
+
+
+class Ribbons(object):
+    # batch of segment polygons, one for each pair of consecutive points sharing a case value
+    # start holds the index of the point each segment begins at, vertices the (x, y) corners
+    # of each polygon and vertex_count whether the polygon is a triangle (taper) or a quad
+    def __init__(self, start, angle, vertices, vertex_count):
+        self.start = start
+        self.angle = angle
+        self.vertices = vertices
+        self.vertex_count = vertex_count
+
+    def __len__(self):
+        return len(self.start)
+
+    def subset(self, mask):
+        # the segments selected by a boolean mask or index array
+        return Ribbons(self.start[mask], self.angle[mask], self.vertices[mask], self.vertex_count[mask])
+
+    def rings(self):
+        # yield the vertex list of each polygon as (x, y) tuples
+        for vertices, count in zip(self.vertices.tolist(), self.vertex_count.tolist()):
+            yield [tuple(vertex) for vertex in vertices[:count]]
+
+
+def build_ribbons(x, y, half_widths, cases, cap_type=BUTT, method=GEODESIC, spheroid=WGS84, tracks=None):
+    # construct the polygons for every segment of every track in one batch
+    # points must already be ordered by case and then by the sort field
+    # a TrackIndex already built for the cases may be passed to avoid finding the track boundaries again
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    half_widths = np.asarray(half_widths, dtype=np.float64)
+    if tracks is None:
+        tracks = TrackIndex(cases)
+    point_count = len(x)
+
+    # a segment joins each point to the next one of its track
+    start = tracks.segment_starts()
+    end = start + 1
+
+    # the heading at each vertex runs from the preceding to the proceeding point of the track
+    # falling back to the vertex itself at either end of a track
+    index = np.arange(point_count)
+    previous = np.where(tracks.first, index, index - 1)
+    proceeding = np.where(tracks.last, index, index + 1)
+    heading = find_angles(x[previous], y[previous], x[proceeding], y[proceeding])
+
+    # offset every vertex once to either side, consecutive segments share these corners
+    right_x, right_y = offset_points(x, y, heading + 90, half_widths, method, spheroid)
+    left_x, left_y = offset_points(x, y, heading - 90, half_widths, method, spheroid)
+    right = np.column_stack((right_x, right_y))
+    left = np.column_stack((left_x, left_y))
+    centre = np.column_stack((x, y))
+
+    vertices = np.empty((len(start), 4, 2))
+    vertices[:, 0] = right[start]
+    vertices[:, 1] = left[start]
+    vertices[:, 2] = left[end]
+    vertices[:, 3] = right[end]
+    vertex_count = np.full(len(start), 4, dtype=np.intp)
+
+    if cap_type == TAPER:
+        # the first segment of a track narrows to its first point
+        lead = tracks.first[start]
+        vertices[lead, 0] = centre[start[lead]]
+        vertices[lead, 1] = left[end[lead]]
+        vertices[lead, 2] = right[end[lead]]
+        vertex_count[lead] = 3
+
+        # the last segment of a track narrows to its last point
+        tail = tracks.last[end] & ~lead
+        vertices[tail, 0] = centre[end[tail]]
+        vertices[tail, 1] = left[start[tail]]
+        vertices[tail, 2] = right[start[tail]]
+        vertex_count[tail] = 3
+
+    angle = find_angles(x[start], y[start], x[end], y[end])
+    return Ribbons(start, angle, vertices, vertex_count)
+
+
+class TrackRibbons(object):
+    # batch of track polygons, one for each track of two or more points
+    # start and end hold the index of the first and one past the last point of each track, vertices
+    # the (x, y) corners of every ring one after the other and offsets where each ring begins
+    def __init__(self, start, end, vertices, offsets):
+        self.start = start
+        self.end = end
+        self.vertices = vertices
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.start)
+
+    def rings(self):
+        # yield the vertex list of each polygon as (x, y) tuples
+        vertices = [tuple(vertex) for vertex in self.vertices.tolist()]
+        offsets = self.offsets.tolist()
+        for begin, end in zip(offsets[:-1], offsets[1:]):
+            yield vertices[begin:end]
+
+
+def build_track_ribbons(x, y, half_widths, cases, cap_type=BUTT, method=GEODESIC, spheroid=WGS84, tracks=None,
+                        miter_limit=MITER_LIMIT):
+    # construct a single polygon for every track, joining consecutive segments at shared vertices
+    # points must already be ordered by case and then by the sort field
+    # a track crossing itself gives a self-intersecting ring, which is written as it is
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    half_widths = np.asarray(half_widths, dtype=np.float64)
+    if tracks is None:
+        tracks = TrackIndex(cases)
+    point_count = len(x)
+
+    # a point repeating the position before it has no heading of its own, so rings are built without
+    # the repeats while start and end still span every point of the track
+    repeat = np.zeros(point_count, dtype=bool)
+    repeat[1:] = (x[1:] == x[:-1]) & (y[1:] == y[:-1])
+    repeat &= ~tracks.first
+    if repeat.any():
+        kept = np.flatnonzero(~repeat)
+        track_number = (np.cumsum(tracks.first) - 1)[kept]
+        built = build_track_ribbons(x[kept], y[kept], half_widths[kept], track_number, cap_type, method, spheroid,
+                                    miter_limit=miter_limit)
+        built_tracks = track_number[built.start]
+        return TrackRibbons(tracks.starts[built_tracks], tracks.ends[built_tracks], built.vertices, built.offsets)
+
+    # azimuth of the segments arriving at and leaving each vertex, the ends of a track only have one
+    index = np.arange(point_count)
+    previous = np.where(tracks.first, index, index - 1)
+    proceeding = np.where(tracks.last, index, index + 1)
+    arriving = np.where(tracks.first, 0.0, find_angles(x[previous], y[previous], x, y))
+    leaving = np.where(tracks.last, 0.0, find_angles(x, y, x[proceeding], y[proceeding]))
+    arriving = np.where(tracks.first, leaving, arriving)
+    leaving = np.where(tracks.last, arriving, leaving)
+
+    # each vertex is offset along the bisector of its bend, stretched so both sides keep their width
+    turn = (leaving - arriving + 180) % 360 - 180
+    bisector = arriving + turn / 2
+    miter = 1 / np.cos(np.radians(turn / 2))
+    bevel = miter > miter_limit
+    distance = half_widths * np.minimum(miter, miter_limit)
+    right_x, right_y = offset_points(x, y, bisector + 90, distance, method, spheroid)
+    left_x, left_y = offset_points(x, y, bisector - 90, distance, method, spheroid)
+    right = np.column_stack((right_x, right_y))
+    left = np.column_stack((left_x, left_y))
+    centre = np.column_stack((x, y))
+
+    # sharp bends are bevelled on their outside, a right turn swings the left side around the bend
+    outside = np.where(turn > 0, -90.0, 90.0)[bevel]
+    bevel_in = np.column_stack(offset_points(x[bevel], y[bevel], arriving[bevel] + outside, half_widths[bevel],
+                                             method, spheroid))
+    bevel_out = np.column_stack(offset_points(x[bevel], y[bevel], leaving[bevel] + outside, half_widths[bevel],
+                                              method, spheroid))
+    on_left = turn[bevel] > 0
+
+    def side(corners, bevelled):
+        # the corners of one side in track order, two at every bevelled vertex
+        counts = np.ones(point_count, dtype=np.intp)
+        bevel_index = np.flatnonzero(bevel)[bevelled]
+        counts[bevel_index] = 2
+        offsets = np.r_[0, np.cumsum(counts)]
+        chain = np.empty((offsets[-1], 2))
+        chain[offsets[:-1]] = corners
+        chain[offsets[bevel_index]] = bevel_in[bevelled]
+        chain[offsets[bevel_index] + 1] = bevel_out[bevelled]
+        return chain, offsets
+
+    left_chain, left_offsets = side(left, on_left)
+    right_chain, right_offsets = side(right, ~on_left)
+
+    # walk up the left side and back down the right side of every track
+    keep = tracks.ends - tracks.starts > 1
+    starts = tracks.starts[keep]
+    ends = tracks.ends[keep]
+    rings = []
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        if cap_type == TAPER and end - start == 2:
+            # a single segment narrows from its first point, as in the segment output
+            rings.append(np.vstack((left[end - 1], right[end - 1], centre[start])))
+        elif cap_type == TAPER:
+            rings.append(np.vstack((left_chain[left_offsets[start + 1]:left_offsets[end - 1]], centre[end - 1],
+                                    right_chain[right_offsets[start + 1]:right_offsets[end - 1]][::-1],
+                                    centre[start])))
+        else:
+            rings.append(np.vstack((left_chain[left_offsets[start]:left_offsets[end]],
+                                    right_chain[right_offsets[start]:right_offsets[end]][::-1])))
+    offsets = np.r_[0, np.cumsum([len(ring) for ring in rings])].astype(np.intp)
+    vertices = np.vstack(rings) if rings else np.empty((0, 2))
+    return TrackRibbons(starts, ends, vertices, offsets)
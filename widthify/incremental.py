@@ -0,0 +1,43 @@
+# bookkeeping for updating an existing output with the points appended to each track since the last run
+#
+# the state of a track is the sort value of three of its points:
+#   tail     the point two before the last, the first point needed to rebuild the end of the track
+#   restart  the point before the last, the start of the terminal segment that changes shape
+#            once the track grows
+#   last     the last point processed
+# segments starting before restart keep their shape when points are appended, so only the terminal
+# segment is deleted and rebuilt along with the segments of the new points
+
+
+def track_state(sort_values):
+    # (tail, restart, last) sort values of a track from its ordered sort values
+    count = len(sort_values)
+    return sort_values[max(0, count - 3)], sort_values[max(0, count - 2)], sort_values[-1]
+
+
+class IncrementalPlan(object):
+    # decides which points and tracks an incremental run has to process
+    # states maps a case value to its (tail, restart, last) state and settings holds the width
+    # bounds and tool settings the existing output was built with
+    def __init__(self, states, settings):
+        self.states = states
+        self.settings = settings
+
+    def matches(self, settings):
+        # widths of existing polygons only hold while the range and the settings are unchanged
+        return self.settings == settings
+
+    def include(self, case, sort_value):
+        # whether a point is needed, new tracks are read whole and known tracks from their tail
+        state = self.states.get(case)
+        return state is None or sort_value >= state[0]
+
+    def changed(self, case, last_sort):
+        # whether a track has points beyond the last one processed
+        state = self.states.get(case)
+        return state is None or last_sort > state[2]
+
+    def restart(self, case):
+        # sort value the rebuilt segments of a known track start from, None for a new track
+        state = self.states.get(case)
+        return None if state is None else state[1]
@@ -0,0 +1,154 @@
+import cProfile
+import datetime
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+class Instruments(object):
+    # wall time, CPU time and item count of each named stage of a run along with named counters
+    # a stage entered more than once, e.g. once per track when streaming, accumulates over its calls
+    # stages may nest, so the time of a stage includes that of the stages run within it
+    # CPU time is that of this process, the worker processes of the PARALLEL mode are not included and
+    # stages running on the threads of the OVERLAPPED mode each count the CPU time of all of them
+    # queues holds the summary of every queue between the stages of the OVERLAPPED mode
+    def __init__(self):
+        self.stages = OrderedDict()
+        self.counters = OrderedDict()
+        self.queues = OrderedDict()
+        self.lock = threading.Lock()
+        self.started = datetime.datetime.now()
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+
+    def _record(self, name, wall, cpu, items):
+        with self.lock:
+            stage = self.stages.get(name)
+            if stage is None:
+                stage = self.stages[name] = {'calls': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'items': 0}
+            stage['calls'] += 1
+            stage['wall_seconds'] += wall
+            stage['cpu_seconds'] += cpu
+            stage['items'] += items
+
+    @contextmanager
+    def stage(self, name, items=0):
+        # time the enclosed block as a call of the named stage
+        # the yielded dict may be given the item count when it is only known at the end of the block
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        tally = {'items': items}
+        try:
+            yield tally
+        finally:
+            self._record(name, time.perf_counter() - wall, time.process_time() - cpu, tally['items'])
+
+    def iterate(self, name, iterable, size=None):
+        # yield from iterable, timing the production of each item as a call of the named stage
+        # size gives the item count of each yielded item, one otherwise
+        iterator = iter(iterable)
+        while True:
+            wall = time.perf_counter()
+            cpu = time.process_time()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            self._record(name, time.perf_counter() - wall, time.process_time() - cpu,
+                         1 if size is None else size(item))
+            yield item
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + int(amount)
+
+    def summary(self, **details):
+        # structured summary of the run so far, details are recorded alongside the measurements
+        stages = OrderedDict()
+        for name, stage in self.stages.items():
+            stage = OrderedDict(stage)
+            stage['items_per_second'] = stage['items'] / stage['wall_seconds'] if stage['wall_seconds'] else None
+            stages[name] = stage
+        summary = OrderedDict()
+        summary['started'] = self.started.isoformat()
+        summary['wall_seconds'] = time.perf_counter() - self.wall
+        summary['cpu_seconds'] = time.process_time() - self.cpu
+        summary.update(details)
+        summary['stages'] = stages
+        summary['counters'] = OrderedDict(self.counters)
+        if self.queues:
+            summary['queues'] = OrderedDict(self.queues)
+        return summary
+
+    def write(self, path, **details):
+        # write the run summary as JSON
+        with open(path, 'w') as summary_file:
+            json.dump(self.summary(**details), summary_file, indent=2, default=str)
+
+    def report(self, log):
+        # time and throughput of every stage, followed by the non-zero counters and the queues
+        for name, stage in self.stages.items():
+            rate = ''
+            if stage['items'] and stage['wall_seconds']:
+                rate = ', {0} items at {1:,.0f}/s'.format(stage['items'], stage['items'] / stage['wall_seconds'])
+            log.verbose('...{0}: {1:.3f} s wall, {2:.3f} s CPU over {3} calls{4}', name, stage['wall_seconds'],
+                        stage['cpu_seconds'], stage['calls'], rate)
+        for name, value in self.counters.items():
+            if value:
+                log.verbose('...{0}: {1}', name, value)
+        for name, stage_queue in self.queues.items():
+            log.verbose('...{0} queue: depth {1:.1f} mean, {2} max of {3}, producers blocked {4:.3f} s, '
+                        'consumers waiting {5:.3f} s', name, stage_queue['mean_depth'], stage_queue['max_depth'],
+                        stage_queue['size'], stage_queue['put_wait_seconds'], stage_queue['get_wait_seconds'])
+
+
+class TimedCall(object):
+    # callable recording every call of function as a call of the named stage, counting the length of its
+    # first argument as items, e.g. the offset method handed to the geometry builders
+    def __init__(self, function, instruments, name):
+        self.function = function
+        self.instruments = instruments
+        self.name = name
+
+    def __call__(self, *args, **kwargs):
+        with self.instruments.stage(self.name, len(args[0])):
+            return self.function(*args, **kwargs)
+
+
+class RunProfiler(object):
+    # profile of a run written to path, pyinstrument reports for .html and .txt paths and cProfile
+    # statistics, readable with pstats or snakeviz, for any other path
+    def __init__(self, path):
+        self.path = path
+        self.extension = os.path.splitext(path)[1].lower()
+        if self.extension in ('.html', '.txt'):
+            from pyinstrument import Profiler
+            self.profiler = Profiler()
+        else:
+            self.profiler = cProfile.Profile()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def start(self):
+        if isinstance(self.profiler, cProfile.Profile):
+            self.profiler.enable()
+        else:
+            self.profiler.start()
+
+    def stop(self):
+        if isinstance(self.profiler, cProfile.Profile):
+            self.profiler.disable()
+            self.profiler.dump_stats(self.path)
+            return
+        self.profiler.stop()
+        with open(self.path, 'w') as profile_file:
+            profile_file.write(self.profiler.output_html() if self.extension == '.html' else
+                               self.profiler.output_text())
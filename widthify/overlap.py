@@ -0,0 +1,190 @@
+import queue
+import threading
+import time
+from collections import OrderedDict
+from itertools import chain
+
+from .store import PointStore
+
+
+class Stopped(Exception):
+    # raised within a stage when another stage of the overlapped run has failed
+    pass
+
+
+class StageQueue(object):
+    # bounded queue between two stages recording how long its producers waited on a full queue
+    # (backpressure from the stage downstream) and its consumers on an empty one (starvation from the
+    # stage upstream), along with the depth seen by every item put, None marks the end of the items
+    def __init__(self, name, size, stop):
+        self.name = name
+        self.size = size
+        self.stop = stop
+        self.queue = queue.Queue(size)
+        self.items = 0
+        self.depth_total = 0
+        self.max_depth = 0
+        self.put_wait = 0.0
+        self.get_wait = 0.0
+
+    def put(self, item):
+        start = time.perf_counter()
+        while True:
+            try:
+                self.queue.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                if self.stop.is_set():
+                    raise Stopped()
+        self.put_wait += time.perf_counter() - start
+        if item is None:
+            return
+        depth = self.queue.qsize()
+        self.items += 1
+        self.depth_total += depth
+        self.max_depth = max(self.max_depth, depth)
+
+    def get(self):
+        start = time.perf_counter()
+        while True:
+            try:
+                item = self.queue.get(timeout=0.1)
+                break
+            except queue.Empty:
+                if self.stop.is_set():
+                    raise Stopped()
+        self.get_wait += time.perf_counter() - start
+        return item
+
+    def summary(self):
+        return OrderedDict([('size', self.size), ('items', self.items), ('max_depth', self.max_depth),
+                            ('mean_depth', self.depth_total / float(self.items) if self.items else 0.0),
+                            ('put_wait_seconds', self.put_wait), ('get_wait_seconds', self.get_wait)])
+
+
+def store_batches(points, batch_points=50000):
+    # windows of whole tracks of an ordered point store holding roughly batch_points points each
+    tracks = points.track_index()
+    start = 0
+    for end in tracks.ends.tolist():
+        if end - start >= batch_points:
+            yield points.window(start, end)
+            start = end
+    if start < len(points):
+        yield points.window(start, len(points))
+
+
+def row_batches(tracks, batch_points=50000):
+    # point stores of whole tracks from (case, rows) groups, as iter_tracks yields them, holding roughly
+    # batch_points points each, only the batch being gathered is held by the reader
+    batch = []
+    size = 0
+    for case, rows in tracks:
+        batch.append(rows)
+        size += len(rows)
+        if size >= batch_points:
+            yield PointStore.from_rows(chain.from_iterable(batch))
+            batch = []
+            size = 0
+    if batch:
+        yield PointStore.from_rows(chain.from_iterable(batch))
+
+
+class Overlapped(object):
+    # reader, geometry workers and writer running at the same time, linked by queues of depth items
+    # the calling thread reads the batches, worker threads apply compute to each and a writer thread
+    # hands the results to write in the order the batches were read
+    # numpy releases the GIL within its array operations, so the geometry math of a batch overlaps the
+    # cursor I/O of the next one and the inserts of the previous one
+    # no more than depth batches are between the reader and the writer at once, so results finished
+    # ahead of a slow batch wait for it without piling up, and the reader waits in turn
+    # the first exception raised by any stage stops the others and is raised again by run
+    def __init__(self, compute, write, workers=1, depth=4, instruments=None):
+        self.compute = compute
+        self.write = write
+        self.workers = workers
+        self.depth = depth
+        self.instruments = instruments
+        self.stop = threading.Event()
+        self.failure = None
+        self.read_queue = StageQueue('read', depth, self.stop)
+        self.write_queue = StageQueue('write', depth, self.stop)
+        self.slots = threading.Semaphore(depth)
+        self.max_pending = 0
+
+    def _fail(self, error):
+        if self.failure is None:
+            self.failure = error
+        self.stop.set()
+
+    def _take_slot(self):
+        # wait for a written batch to free a slot, counted as backpressure on the reader
+        start = time.perf_counter()
+        while not self.slots.acquire(timeout=0.1):
+            if self.stop.is_set():
+                raise Stopped()
+        self.read_queue.put_wait += time.perf_counter() - start
+
+    def _work(self):
+        try:
+            while True:
+                item = self.read_queue.get()
+                if item is None:
+                    self.write_queue.put(None)
+                    return
+                sequence, batch = item
+                self.write_queue.put((sequence, self.compute(batch)))
+        except Stopped:
+            pass
+        except BaseException as e:
+            self._fail(e)
+
+    def _write(self):
+        # results arriving ahead of their turn wait in pending until the batches before them are written
+        try:
+            pending = {}
+            following = 0
+            finished = 0
+            while finished < self.workers:
+                item = self.write_queue.get()
+                if item is None:
+                    finished += 1
+                    continue
+                pending[item[0]] = item[1]
+                self.max_pending = max(self.max_pending, len(pending))
+                while following in pending:
+                    self.write(pending.pop(following))
+                    self.slots.release()
+                    following += 1
+        except Stopped:
+            pass
+        except BaseException as e:
+            self._fail(e)
+
+    def run(self, batches):
+        threads = [threading.Thread(target=self._work, name='widthify-geometry-{0}'.format(number))
+                   for number in range(self.workers)]
+        threads.append(threading.Thread(target=self._write, name='widthify-writer'))
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        try:
+            if self.instruments is not None:
+                batches = self.instruments.iterate('read', batches, len)
+            for sequence, batch in enumerate(batches):
+                self._take_slot()
+                self.read_queue.put((sequence, batch))
+            for number in range(self.workers):
+                self.read_queue.put(None)
+        except Stopped:
+            pass
+        except BaseException as e:
+            self._fail(e)
+        for thread in threads:
+            thread.join()
+        if self.instruments is not None:
+            self.instruments.queues['read'] = self.read_queue.summary()
+            self.instruments.queues['write'] = self.write_queue.summary()
+            self.instruments.queues['write']['max_pending'] = self.max_pending
+        if self.failure is not None:
+            raise self.failure
@@ -0,0 +1,63 @@
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .geometry import BUTT, GEODESIC, WGS84, TrackRibbons, build_ribbons
+from .tracks import TrackIndex
+
+
+def chunk_tracks(tracks, chunk_points):
+    # split the tracks of a TrackIndex into chunks of whole tracks holding roughly chunk_points points each
+    # returns the index each chunk begins at, followed by the point count as the final end
+    point_count = len(tracks.first)
+    if point_count == 0:
+        return np.zeros(1, dtype=np.intp)
+    track_starts = tracks.starts
+    # a new chunk begins at the first track starting beyond each multiple of chunk_points
+    unused, first_track = np.unique(track_starts // chunk_points, return_index=True)
+    return np.r_[track_starts[first_track], point_count]
+
+
+def pool_context():
+    # inside ArcGIS Pro sys.executable is the application itself rather than the python interpreter
+    # so worker processes have to be pointed at the interpreter of the active environment
+    context = multiprocessing.get_context()
+    if sys.platform == 'win32' and os.path.basename(sys.executable).lower() not in ('python.exe', 'pythonw.exe'):
+        context.set_executable(os.path.join(sys.exec_prefix, 'python.exe'))
+    return context
+
+
+def _build_chunk(task):
+    # runs within a worker process
+    return task[0](*task[1:])
+
+
+def build_ribbons_parallel(x, y, half_widths, cases, cap_type=BUTT, method=GEODESIC, spheroid=WGS84,
+                           workers=None, chunk_points=50000, tracks=None, builder=build_ribbons):
+    # construct the polygons of independent tracks across a pool of worker processes
+    # yields one batch per chunk in input order, with start indices relative to the whole input
+    # builder is build_ribbons for segment polygons or build_track_ribbons for one polygon per track
+    if callable(method):
+        raise ValueError('Parallel construction requires a named offset method, not a callable')
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    half_widths = np.asarray(half_widths, dtype=np.float64)
+    cases = np.asarray(cases)
+
+    if tracks is None:
+        tracks = TrackIndex(cases)
+
+    bounds = chunk_tracks(tracks, chunk_points)
+    tasks = [(builder, x[begin:end], y[begin:end], half_widths[begin:end], cases[begin:end], cap_type, method, spheroid)
+             for begin, end in zip(bounds[:-1], bounds[1:])]
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=pool_context()) as executor:
+        # map hands the results back in submission order so the output keeps the track order
+        for begin, ribbons in zip(bounds[:-1].tolist(), executor.map(_build_chunk, tasks)):
+            ribbons.start += begin
+            if isinstance(ribbons, TrackRibbons):
+                ribbons.end += begin
+            yield ribbons
@@ -0,0 +1,292 @@
+from functools import partial
+
+import numpy as np
+
+from .cache import OffsetCache
+from .geometry import (BUTT, GEODESIC, WGS84, TrackRibbons, build_ribbons, build_track_ribbons, find_angles,
+                       offset_points)
+from .instrument import Instruments, TimedCall
+from .overlap import Overlapped
+from .parallel import build_ribbons_parallel
+from .progress import QUIET, Progress
+from .simplify import simplify_tracks
+from .widths import ClassedWidthScale
+
+# output geometries, a polygon per segment or a single polygon per track
+SEGMENTS = 'SEGMENTS'
+TRACKS = 'TRACKS'
+
+
+def segment_records(points, start, angle):
+    # attributes of both ends of every segment gathered from the point store at once
+    # the classed fields hold the width class of both ends, or their half-width for continuous widths
+    end = start + 1
+    classed = points.half_width if points.width_class is None else points.width_class
+    return zip(points.oid[start].tolist(), points.case_values[points.case_code[start]].tolist(),
+               points.sort[start].tolist(), points.primary[start].tolist(), points.primary[end].tolist(),
+               classed[start].tolist(), classed[end].tolist(),
+               points.secondary[start].tolist(), points.secondary[end].tolist(), angle.tolist())
+
+
+def track_extremes(values, start, end):
+    # minimum and maximum of values over every track, ignoring nulls
+    # the trailing nan keeps the reduction of a track ending at the last point within bounds
+    values = np.append(values, np.nan)
+    bounds = np.column_stack((start, end)).ravel()
+    if not len(bounds):
+        return [], []
+    return np.fmin.reduceat(values, bounds)[::2].tolist(), np.fmax.reduceat(values, bounds)[::2].tolist()
+
+
+def track_records(points, ribbons):
+    # attributes of every track polygon gathered from the point store at once
+    start = ribbons.start
+    end = ribbons.end
+    primary_min, primary_max = track_extremes(points.primary, start, end)
+    secondary_min, secondary_max = track_extremes(points.secondary, start, end)
+    return zip(points.oid[start].tolist(), points.case_values[points.case_code[start]].tolist(),
+               points.sort[start].tolist(), points.sort[end - 1].tolist(), (end - start).tolist(),
+               primary_min, primary_max, secondary_min, secondary_max)
+
+
+class Pipeline(object):
+    # the stages that turn ordered points into polygons, shared by the toolbox script and the API
+    # widths are given in metres and multiplied by width_factor into the units the offsets are applied
+    # in, tolerances of None leave the tracks unsimplified
+    # every stage is timed and the points it could not turn into polygons counted in instruments
+    def __init__(self, width_scale, cap_type=BUTT, method=GEODESIC, spheroid=WGS84, width_factor=1.0,
+                 output_geometry=SEGMENTS, tolerance=None, value_tolerance=None, geographic=False, log=None,
+                 instruments=None):
+        self.width_scale = width_scale
+        self.cap_type = cap_type
+        self.method = method
+        self.spheroid = spheroid
+        self.width_factor = width_factor
+        self.output_geometry = output_geometry
+        self.builder = build_track_ribbons if output_geometry == TRACKS else build_ribbons
+        self.tolerance = tolerance
+        self.value_tolerance = value_tolerance
+        self.geographic = geographic
+        self.log = log if log is not None else Progress(level=QUIET)
+        self.simplified = {'read': 0, 'kept': 0}
+        self.instruments = instruments if instruments is not None else Instruments()
+        # offsets solved within a single process are timed as a stage of their own within construction
+        self.offsets = TimedCall(partial(offset_points, method=method, spheroid=spheroid), self.instruments,
+                                 'offsets')
+
+    @property
+    def simplifying(self):
+        return self.tolerance is not None or self.value_tolerance is not None
+
+    def simplify(self, points, tracks=None, fixed=None):
+        # drop the points that change neither the shape nor the width of their track
+        if not self.simplifying:
+            return points
+        if tracks is None:
+            tracks = points.track_index()
+        with self.instruments.stage('simplify', len(points)):
+            keep = simplify_tracks(points.x, points.y, points.primary, tracks, self.tolerance, self.value_tolerance,
+                                   self.geographic, fixed)
+            kept = int(keep.sum())
+            with self.instruments.lock:
+                self.simplified['read'] += len(points)
+                self.simplified['kept'] += kept
+            self.instruments.count('simplified_points', len(points) - kept)
+            return points.take(keep)
+
+    def scale(self, points):
+        # half-width of every point, along with its class in the classed width modes
+        with self.instruments.stage('scale', len(points)):
+            points.half_width = self.width_scale.half_widths(points.primary)
+            if isinstance(self.width_scale, ClassedWidthScale):
+                points.width_class = self.width_scale.classes(points.primary)
+
+    def drop_widthless(self, points):
+        # points without a finite half-width, those of null primary values, cannot make a sound polygon
+        # and every segment they begin or end is skipped
+        # with a polygon per segment those segments are dropped after construction, see sound, so the
+        # neighbouring segments keep their points, with a polygon per track the points are dropped here
+        # and the track polygon joins the points either side of them
+        widthless = ~np.isfinite(points.half_width)
+        self.instruments.count('null_values', np.count_nonzero(widthless))
+        if not widthless.any():
+            return points
+        start = points.track_index().segment_starts()
+        self.instruments.count('skipped_segments', np.count_nonzero(widthless[start] | widthless[start + 1]))
+        if self.output_geometry == TRACKS:
+            return points.take(~widthless)
+        return points
+
+    def sound(self, points, ribbons):
+        # the segment polygons whose start and end both have a finite half-width
+        if isinstance(ribbons, TrackRibbons):
+            return ribbons
+        finite = np.isfinite(points.half_width)
+        keep = finite[ribbons.start] & finite[ribbons.start + 1]
+        return ribbons if keep.all() else ribbons.subset(keep)
+
+    def tally(self, points, tracks):
+        # count the points and segments that cannot make a sound polygon
+        # a track of a single point has no segment and a segment between two points at the same position
+        # has no direction, null primary values are counted by drop_widthless
+        lengths = tracks.ends - tracks.starts
+        start = tracks.segment_starts()
+        self.instruments.count('points', len(points))
+        self.instruments.count('tracks', len(tracks))
+        self.instruments.count('segments', len(start))
+        self.instruments.count('skipped_points', np.count_nonzero(lengths == 1))
+        self.instruments.count('degenerate_segments', np.count_nonzero((points.x[start] == points.x[start + 1]) &
+                                                                       (points.y[start] == points.y[start + 1])))
+
+    def construct(self, points, tracks=None):
+        # construct the polygons of every track within the point store in one batch
+        with self.instruments.stage('construct', len(points)):
+            return self.sound(points, self.builder(x=points.x,
+                                                   y=points.y,
+                                                   half_widths=points.half_width * self.width_factor,
+                                                   cases=points.case_code,
+                                                   cap_type=self.cap_type,
+                                                   method=self.offsets,
+                                                   spheroid=self.spheroid,
+                                                   tracks=tracks))
+
+    def construct_parallel(self, points, tracks=None, workers=None):
+        # construct the polygons of independent tracks across worker processes, batch by batch
+        # the wait for each batch is timed as construction, the offsets solved by the workers are not timed
+        batches = build_ribbons_parallel(x=points.x,
+                                         y=points.y,
+                                         half_widths=points.half_width * self.width_factor,
+                                         cases=points.case_code,
+                                         cap_type=self.cap_type,
+                                         method=self.method,
+                                         spheroid=self.spheroid,
+                                         workers=workers,
+                                         tracks=tracks,
+                                         builder=self.builder)
+        return (self.sound(points, ribbons) for ribbons in self.instruments.iterate('construct', batches, len))
+
+    def insert(self, writer, points, ribbons, first_key=0):
+        # hand the constructed polygons to the writer along with the attributes of the points they span
+        if isinstance(ribbons, TrackRibbons):
+            records = track_records(points, ribbons)
+        else:
+            records = segment_records(points, ribbons.start, ribbons.angle)
+        with self.instruments.stage('insert', len(ribbons)):
+            for key, record, ring in zip(ribbons.start.tolist(), records, ribbons.rings()):
+                self.log.trace('Processing {0} of {1} points with case {2}...', first_key + key, self.log.total - 1,
+                               record[1])
+                self.log.update(first_key + key)
+                writer.write(list(record) + [ring])
+
+    def insert_segments(self, writer, points, tracks=None):
+        # hand the attributes of every segment to a related table, without geometry
+        if tracks is None:
+            tracks = points.track_index()
+        start = tracks.segment_starts()
+        with self.instruments.stage('segment_table', len(start)):
+            angle = find_angles(points.x[start], points.y[start], points.x[start + 1], points.y[start + 1])
+            for record in segment_records(points, start, angle):
+                writer.write(list(record))
+
+    def process(self, points, writer, segment_writer=None, parallel=False, workers=None):
+        # simplify, scale, construct and write all the points at once
+        # returns the points and TrackIndex the polygons were built from
+        if self.simplifying:
+            points = self.simplify(points)
+            self.log.message('Tracks simplified.')
+
+        # convert the primary attribute of every point to a half-width offset in a single pass
+        # the insert loop then looks the offsets up by point index
+        self.scale(points)
+        points = self.drop_widthless(points)
+        self.log.message('Polygon widths scaled.')
+
+        # find the start and end of every track once so segments can be classified by lookup
+        tracks = points.track_index()
+        self.tally(points, tracks)
+        self.log.message('{0} tracks identified.', len(tracks))
+
+        if parallel:
+            # build independent tracks across worker processes and insert each batch in track order
+            self.log.start('Constructing polygon geometry across {0} worker processes...'.format(
+                workers or 'all available'), len(points))
+            for ribbons in self.construct_parallel(points, tracks, workers):
+                self.instruments.count('polygons', len(ribbons))
+                self.insert(writer, points, ribbons)
+            self.log.finish()
+        else:
+            self.log.message('Constructing polygon geometry...')
+            ribbons = self.construct(points, tracks)
+            self.instruments.count('polygons', len(ribbons))
+            self.log.message('{0} polygons constructed.', len(ribbons))
+            self.log.start('Inserting polygons...', len(points))
+            self.insert(writer, points, ribbons)
+            self.log.finish()
+
+        if segment_writer is not None:
+            self.insert_segments(segment_writer, points, tracks)
+        return points, tracks
+
+    def process_track(self, track, writer, segment_writer=None, first_key=0, restart=None):
+        # simplify, scale, construct and write a single track
+        # with restart only the segments from that sort value on are written, the points up to it are
+        # kept through simplification so the written segments join the existing ones
+        # returns the points the polygons were built from
+        if self.simplifying:
+            track = self.simplify(track, fixed=None if restart is None else track.sort <= restart)
+        self.scale(track)
+        track = self.drop_widthless(track)
+        self.tally(track, track.track_index())
+        ribbons = self.construct(track)
+        if restart is not None:
+            ribbons = ribbons.subset(track.sort[ribbons.start] >= restart)
+        self.instruments.count('polygons', len(ribbons))
+        self.insert(writer, track, ribbons, first_key)
+        if segment_writer is not None:
+            self.insert_segments(segment_writer, track)
+        return track
+
+    def compute_batch(self, batch):
+        # simplify, scale and construct a batch of whole tracks, run on the geometry threads of the
+        # overlapped mode
+        # returns the point count read, the points the polygons were built from and the polygons
+        points = self.simplify(batch) if self.simplifying else batch
+        self.scale(points)
+        points = self.drop_widthless(points)
+        tracks = points.track_index()
+        self.tally(points, tracks)
+        return len(batch), points, self.construct(points, tracks)
+
+    def process_overlapped(self, batches, writer, segment_writer=None, workers=1, depth=4):
+        # read, construct and write batches of whole tracks at the same time, batches being an iterable
+        # of point stores that is read on the calling thread
+        # polygons are written in the order of the batches whatever the number of geometry threads
+        # returns the number of points read
+        first_key = 0
+
+        def write(result):
+            nonlocal first_key
+            read, points, ribbons = result
+            self.instruments.count('polygons', len(ribbons))
+            self.insert(writer, points, ribbons, first_key)
+            if segment_writer is not None:
+                self.insert_segments(segment_writer, points)
+            first_key += read
+
+        Overlapped(self.compute_batch, write, workers, depth, self.instruments).run(batches)
+        return first_key
+
+    def report(self):
+        # summary of the work simplification and the offset cache saved, followed by the time of every
+        # stage at the VERBOSE level
+        if self.simplifying and self.simplified['read']:
+            self.log.message('Simplification kept {0} of {1} points, a reduction of {2:.1%}.',
+                             self.simplified['kept'], self.simplified['read'],
+                             1 - self.simplified['kept'] / float(self.simplified['read']))
+        if isinstance(self.method, OffsetCache):
+            self.instruments.counters['offset_cache_hits'] = self.method.hits
+            self.instruments.counters['offset_cache_misses'] = self.method.misses
+            self.log.message('Offset cache: {0} hits, {1} misses, a hit rate of {2:.1%}.', self.method.hits,
+                             self.method.misses, self.method.hit_rate())
+        self.log.verbose('Stage timings and counters:')
+        self.instruments.report(self.log)
@@ -0,0 +1,85 @@
+import time
+
+# verbosity levels, each level includes the messages of the levels below it
+QUIET = 0
+NORMAL = 1
+VERBOSE = 2
+TRACE = 3
+
+LEVELS = {'QUIET': QUIET, 'NORMAL': NORMAL, 'VERBOSE': VERBOSE, 'TRACE': TRACE}
+
+
+class Progress(object):
+    # message and progress reporting with verbosity levels and rate limited progress updates
+    # emit receives each message that passes the verbosity level, start(label) is called when
+    # a counted task begins and position(percent) at most every step percent or interval seconds
+    # messages are only formatted when they will actually be emitted
+    def __init__(self, emit=print, level=NORMAL, start=None, position=None, step=1, interval=2.0,
+                 message_step=10):
+        self.emit = emit
+        self.level = LEVELS.get(level, level) if level is not None else NORMAL
+        self.on_start = start
+        self.on_position = position
+        self.step = step
+        self.interval = interval
+        self.message_step = message_step
+        self.label = ''
+        self.total = 0
+        self.percent = 0
+        self.reported_percent = 0
+        self.reported_time = 0
+
+    def _emit(self, level, text, args):
+        if self.level >= level:
+            self.emit(text.format(*args) if args else text)
+
+    def warning(self, text, *args):
+        # emitted at every verbosity level
+        self._emit(QUIET, text, args)
+
+    def message(self, text, *args):
+        self._emit(NORMAL, text, args)
+
+    def verbose(self, text, *args):
+        self._emit(VERBOSE, text, args)
+
+    def trace(self, text, *args):
+        # per point detail, off unless the TRACE level is requested
+        self._emit(TRACE, text, args)
+
+    def start(self, label, total):
+        # begin a counted task of total items
+        self.label = label
+        self.total = total
+        self.percent = 0
+        self.reported_percent = 0
+        self.reported_time = time.time()
+        if self.on_start is not None:
+            self.on_start(label)
+        self.message(label)
+
+    def update(self, done):
+        # report done of total items, cheap enough to call for every item
+        percent = int(100 * done / self.total) if self.total else 100
+        if percent == self.percent:
+            return
+        self.percent = percent
+        now = time.time()
+        if percent - self.reported_percent < self.step and now - self.reported_time < self.interval:
+            return
+        if self.on_position is not None:
+            self.on_position(percent)
+        if percent // self.message_step > self.reported_percent // self.message_step:
+            self.message('...{0}% ({1} of {2})', percent, done, self.total)
+        else:
+            self.verbose('...{0}% ({1} of {2})', percent, done, self.total)
+        self.reported_percent = percent
+        self.reported_time = now
+
+    def finish(self):
+        # report the completion of the task if the last update was held back
+        if self.reported_percent < 100:
+            self.percent = self.reported_percent = 100
+            if self.on_position is not None:
+                self.on_position(100)
+            self.message('...100% ({0} of {0})', self.total)
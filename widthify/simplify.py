@@ -0,0 +1,92 @@
+import numpy as np
+
+from .tracks import TrackIndex
+
+# metres per degree of latitude, and of longitude at the equator
+METRES_PER_DEGREE = 111319.49
+
+
+def metric_coordinates(x, y, tracks, geographic=False):
+    # coordinates in which distances are measured for the spatial tolerance
+    # geographic coordinates are projected around the mean latitude of each track, close enough over
+    # a single track for comparing its deviation from its chords
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if not geographic or not len(x):
+        return x, y
+    mean_latitude = np.add.reduceat(y, tracks.starts) / (tracks.ends - tracks.starts)
+    scale = np.repeat(np.cos(np.radians(mean_latitude)), tracks.ends - tracks.starts)
+    return x * METRES_PER_DEGREE * scale, y * METRES_PER_DEGREE
+
+
+def _exceeds(change, tolerance):
+    # change relative to a tolerance, where a tolerance of zero only lets through no change at all
+    if tolerance:
+        return change / tolerance
+    return np.where(change > 0, np.inf, 0.0)
+
+
+def simplify_tracks(x, y, values, tracks, tolerance=None, value_tolerance=None, geographic=False, fixed=None):
+    # Douglas-Peucker over every track of a TrackIndex, extended to the primary attribute
+    # a point is dropped when it lies within tolerance of the chord between the points kept either side
+    # of it and its value within value_tolerance of the value interpolated along that chord
+    # a tolerance of None is not checked, fixed marks points that must be kept
+    # tolerance is in metres for geographic coordinates and in the units of the coordinates otherwise
+    # returns a boolean mask of the points kept
+    point_count = len(x)
+    keep = np.ones(point_count, dtype=bool)
+    if tolerance is None and value_tolerance is None:
+        return keep
+    x, y = metric_coordinates(x, y, tracks, geographic)
+    values = np.asarray(values, dtype=np.float64)
+    distance = np.r_[0, np.cumsum(np.hypot(np.diff(x), np.diff(y)))]
+    index = np.arange(point_count)
+
+    # the ends of every track are kept and every point in between starts out undecided
+    keep = tracks.first | tracks.last
+    if fixed is not None:
+        keep |= fixed
+    undecided = ~keep
+
+    # every pass checks the points of all open spans between kept points at once, splitting each span
+    # at its worst point, until every point of a span is within both tolerances
+    while undecided.any():
+        points = np.flatnonzero(undecided)
+        first = np.maximum.accumulate(np.where(keep, index, 0))[points]
+        last = np.minimum.accumulate(np.where(keep, index, point_count)[::-1])[::-1][points]
+
+        error = np.zeros(len(points))
+        if tolerance is not None:
+            # distance of each point from its chord, or from the chord start when the chord has no length
+            dx = x[last] - x[first]
+            dy = y[last] - y[first]
+            length = np.hypot(dx, dy)
+            px = x[points] - x[first]
+            py = y[points] - y[first]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                offset = np.where(length > 0, np.abs(px * dy - py * dx) / length, np.hypot(px, py))
+            error = np.maximum(error, _exceeds(offset, tolerance))
+        if value_tolerance is not None:
+            # difference from the value interpolated by distance along the track, or by position when the
+            # span has no length
+            span = distance[last] - distance[first]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                share = np.where(span > 0, (distance[points] - distance[first]) / span,
+                                 (points - first) / (last - first).astype(np.float64))
+            change = np.abs(values[points] - (values[first] + share * (values[last] - values[first])))
+            error = np.maximum(error, _exceeds(np.nan_to_num(change, nan=0.0), value_tolerance))
+
+        # worst point of every span, the spans are runs of the same first index
+        order = np.lexsort((-error, first))
+        worst = order[np.r_[0, np.flatnonzero(np.diff(first[order])) + 1]]
+        split = error[worst] > 1
+        keep[points[worst[split]]] = True
+        undecided[points] = np.isin(first, first[worst[split]])
+        undecided[keep] = False
+    return keep
+
+
+def simplify_track(x, y, values, tolerance=None, value_tolerance=None, geographic=False, fixed=None):
+    # mask of the points kept by simplifying a single track
+    return simplify_tracks(x, y, values, TrackIndex(np.zeros(len(x), dtype=np.int8)), tolerance, value_tolerance,
+                           geographic, fixed)
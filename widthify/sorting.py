@@ -0,0 +1,200 @@
+import datetime
+import heapq
+import os
+import shutil
+import tempfile
+from array import array
+
+import numpy as np
+
+# dates are held as microseconds since the epoch, read back as datetime64[us]
+EPOCH = datetime.datetime(1970, 1, 1)
+MICROSECOND = datetime.timedelta(microseconds=1)
+
+
+class SortColumn(object):
+    # sort values gathered into a typed array as they arrive, integers as int64, floats as float64 (with
+    # integers promoted once a float appears), dates as microseconds and text as a list of strings
+    # nulls are flagged apart from the values and hold a placeholder of the column type
+    def __init__(self):
+        self.kind = None
+        self.values = None
+        self.placeholder = None
+        self.nulls = bytearray()
+        self.leading = 0
+
+    def _start(self, value):
+        if isinstance(value, datetime.date):
+            self.kind, self.values, self.placeholder = 'date', array('q'), 0
+        elif isinstance(value, float):
+            self.kind, self.values, self.placeholder = 'float', array('d'), 0.0
+        elif isinstance(value, int):
+            self.kind, self.values, self.placeholder = 'int', array('q'), 0
+        elif isinstance(value, str):
+            self.kind, self.values, self.placeholder = 'text', [], ''
+        else:
+            raise TypeError('Cannot sort values of type {0}'.format(type(value).__name__))
+        self.values.extend([self.placeholder] * self.leading)
+
+    def append(self, value):
+        if value is None:
+            self.nulls.append(1)
+            if self.kind is None:
+                self.leading += 1
+            else:
+                self.values.append(self.placeholder)
+            return
+        self.nulls.append(0)
+        if self.kind is None:
+            self._start(value)
+        if self.kind == 'date':
+            if not isinstance(value, datetime.datetime):
+                value = datetime.datetime.combine(value, datetime.time())
+            value = (value - EPOCH) // MICROSECOND
+        elif self.kind == 'int' and isinstance(value, float):
+            self.kind, self.values, self.placeholder = 'float', array('d', self.values), 0.0
+        self.values.append(value)
+
+    def columns(self):
+        # the values and null flags as arrays
+        nulls = np.frombuffer(self.nulls, dtype=np.bool_)
+        if self.kind is None:
+            return np.zeros(len(nulls), dtype=np.int64), nulls
+        if self.kind == 'text':
+            return np.array(self.values), nulls
+        if self.kind == 'float':
+            return np.frombuffer(self.values, dtype=np.float64), nulls
+        values = np.frombuffer(self.values, dtype=np.int64)
+        return (values.view('datetime64[us]') if self.kind == 'date' else values), nulls
+
+
+class SortChunk(object):
+    # typed columns of up to a chunk of (oid, case, sort, primary, secondary, x, y) rows, filled as the
+    # rows arrive so no row tuple is kept, case values are encoded as integer codes like the point store
+    def __init__(self):
+        self.oid = array('q')
+        self.case_code = array('i')
+        self.codes = {}
+        self.sort = SortColumn()
+        self.primary = array('d')
+        self.secondary = array('d')
+        self.x = array('d')
+        self.y = array('d')
+
+    def __len__(self):
+        return len(self.oid)
+
+    def append(self, row):
+        nan = float('nan')
+        self.oid.append(row[0])
+        self.case_code.append(self.codes.setdefault(row[1], len(self.codes)))
+        self.sort.append(row[2])
+        self.primary.append(nan if row[3] is None else row[3])
+        self.secondary.append(nan if row[4] is None else row[4])
+        self.x.append(row[5])
+        self.y.append(row[6])
+
+    def ordered(self):
+        # the columns ordered by case and then sort with nulls first, as a mapping of column names to
+        # arrays, along with the case value of every code
+        # columns are reordered one at a time so only one extra column is held at once
+        case_values = list(self.codes)
+        rank = np.empty(len(case_values), dtype=np.int32)
+        rank[sorted(range(len(case_values)), key=lambda code: (case_values[code] is not None,
+                                                               case_values[code]))] = np.arange(len(case_values))
+        case_code = np.frombuffer(self.case_code, dtype=np.int32)
+        sort, sort_null = self.sort.columns()
+        order = np.lexsort((sort, ~sort_null, rank[case_code]))
+        columns = {'oid': np.frombuffer(self.oid, dtype=np.int64), 'case': case_code, 'sort': sort,
+                   'sort_null': sort_null, 'primary': np.frombuffer(self.primary),
+                   'secondary': np.frombuffer(self.secondary), 'x': np.frombuffer(self.x),
+                   'y': np.frombuffer(self.y)}
+        self.__init__()
+        for name in COLUMNS:
+            columns[name] = columns[name][order]
+        return columns, case_values
+
+
+# columns of a sorted chunk in the order they are spilled
+COLUMNS = ('oid', 'case', 'sort', 'sort_null', 'primary', 'secondary', 'x', 'y')
+
+
+def iter_chunk(columns, case_values, block=10000):
+    # rows of the ordered columns of a chunk, in memory or memory mapped, converted to python values a
+    # block at a time with null sort values restored as None
+    for start in range(0, len(columns['oid']), block):
+        stop = start + block
+        case = [case_values[code] for code in columns['case'][start:stop].tolist()]
+        sort = [None if null else value for value, null in zip(columns['sort'][start:stop].tolist(),
+                                                               columns['sort_null'][start:stop].tolist())]
+        for row in zip(columns['oid'][start:stop].tolist(), case, sort, columns['primary'][start:stop].tolist(),
+                       columns['secondary'][start:stop].tolist(), columns['x'][start:stop].tolist(),
+                       columns['y'][start:stop].tolist()):
+            yield row
+
+
+def merge_key(row):
+    # case and then sort with nulls first, matching the order of every chunk
+    return row[1] is not None, row[1], row[2] is not None, row[2]
+
+
+class ExternalSort(object):
+    # orders (oid, case, sort, primary, secondary, x, y) rows by case and sort with bounded memory,
+    # for sources that cannot serve an ORDER BY or only slowly
+    # rows are gathered into typed columns chunk_points at a time and each chunk ordered with a lexsort,
+    # an input fitting in a single chunk is yielded straight from memory, otherwise every chunk is
+    # spilled to a memory mapped file in directory (the system temporary directory by default) and the
+    # chunks merged, holding a block of each in memory
+    # null case and sort values are ordered first, null primary and secondary values are yielded as nan
+    def __init__(self, chunk_points=5000000, directory=None):
+        self.chunk_points = chunk_points
+        self.directory = directory
+        self.chunks = 0
+        self.spilled = False
+
+    def _fill(self, chunk, rows):
+        # fill the chunk from rows, returning the row following a full chunk or None at the end of rows
+        for row in rows:
+            if len(chunk) >= self.chunk_points:
+                return row
+            chunk.append(row)
+        return None
+
+    def sort(self, rows):
+        rows = iter(rows)
+        chunk = SortChunk()
+        following = self._fill(chunk, rows)
+        if not len(chunk):
+            return
+        self.chunks = 1
+        if following is None:
+            columns, case_values = chunk.ordered()
+            for row in iter_chunk(columns, case_values):
+                yield row
+            return
+
+        # spill every chunk to disk and merge the chunks
+        self.spilled = True
+        spill_directory = tempfile.mkdtemp(prefix='widthify_sort_', dir=self.directory)
+        try:
+            spills = []
+            while len(chunk):
+                path = os.path.join(spill_directory, 'chunk_{0}.npy'.format(len(spills)))
+                columns, case_values = chunk.ordered()
+                spilled = np.lib.format.open_memmap(path, mode='w+', shape=(len(columns['oid']),),
+                                                    dtype=[(name, columns[name].dtype) for name in COLUMNS])
+                for name in COLUMNS:
+                    spilled[name] = columns[name]
+                spilled.flush()
+                del spilled, columns
+                spills.append((path, case_values))
+                if following is not None:
+                    chunk.append(following)
+                    following = self._fill(chunk, rows)
+            self.chunks = len(spills)
+            chunks = [iter_chunk(np.load(path, mmap_mode='r'), case_values) for path, case_values in spills]
+            for row in heapq.merge(*chunks, key=merge_key):
+                yield row
+            del chunks
+        finally:
+            shutil.rmtree(spill_directory, ignore_errors=True)
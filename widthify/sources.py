@@ -0,0 +1,157 @@
+import csv
+import os
+import sqlite3
+import struct
+
+import numpy as np
+
+from .store import PointStore
+
+# bytes of the envelope following a GeoPackage geometry header, by the envelope indicator of its flags
+ENVELOPE_SIZES = {0: 0, 1: 32, 2: 48, 3: 48, 4: 64}
+
+
+def convert_column(values):
+    # typed array of text values, integers or floats where every value converts and text otherwise
+    # empty values of numeric columns are read as nan
+    for convert, dtype in ((int, np.int64), (float, np.float64)):
+        try:
+            converted = [convert(value) if value != '' else None for value in values]
+        except ValueError:
+            continue
+        if dtype is np.int64 and None in converted:
+            continue
+        return np.array([np.nan if value is None else value for value in converted], dtype=dtype)
+    return np.array(values)
+
+
+def field_type(values):
+    # geoprocessing field type holding a column of values
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.integer):
+        return 'LONG'
+    if np.issubdtype(values.dtype, np.floating):
+        return 'DOUBLE'
+    if np.issubdtype(values.dtype, np.datetime64):
+        return 'DATE'
+    return 'TEXT'
+
+
+def point_wkb(data, offset=0):
+    # x and y of a well-known binary point
+    byte_order = '<' if data[offset] == 1 else '>'
+    geometry_type = struct.unpack_from(byte_order + 'I', data, offset + 1)[0]
+    if geometry_type % 1000 != 1:
+        raise ValueError('Expected point geometries, found geometry type {0}'.format(geometry_type))
+    return struct.unpack_from(byte_order + '2d', data, offset + 5)
+
+
+def geopackage_point(blob):
+    # x and y of a GeoPackage binary point, skipping its header and envelope
+    flags = blob[3]
+    return point_wkb(blob, 8 + ENVELOPE_SIZES[(flags >> 1) & 0b111])
+
+
+def read_csv(path, fields, x_field='x', y_field='y'):
+    # columns of a delimited text file with the point coordinates held in two of its columns
+    with open(path, newline='') as csv_file:
+        rows = list(csv.DictReader(csv_file))
+    columns = dict((field, convert_column([row[field] for row in rows])) for field in fields)
+    columns['x'] = np.array([float(row[x_field]) for row in rows])
+    columns['y'] = np.array([float(row[y_field]) for row in rows])
+    return columns, 0
+
+
+def read_geopackage(path, fields, table=None):
+    # columns of a GeoPackage point table, the first features table unless one is named
+    connection = sqlite3.connect(path)
+    try:
+        if table is None:
+            table = connection.execute('SELECT table_name FROM gpkg_contents WHERE data_type = \'features\' '
+                                       'ORDER BY table_name').fetchone()[0]
+        geometry_column, srs_id = connection.execute(
+            'SELECT column_name, srs_id FROM gpkg_geometry_columns WHERE table_name = ?', (table,)).fetchone()
+        rows = connection.execute('SELECT "{0}", {1} FROM "{2}"'.format(
+            geometry_column, ', '.join('"{0}"'.format(field) for field in fields), table)).fetchall()
+    finally:
+        connection.close()
+    coordinates = np.array([geopackage_point(row[0]) for row in rows], dtype=np.float64).reshape(-1, 2)
+    columns = {'x': coordinates[:, 0], 'y': coordinates[:, 1]}
+    for position, field in enumerate(fields, 1):
+        values = [row[position] for row in rows]
+        if all(isinstance(value, (int, float)) or value is None for value in values):
+            values = np.array([np.nan if value is None else value for value in values])
+            if not np.isnan(values).any() and np.all(values == np.round(values)):
+                values = values.astype(np.int64)
+            columns[field] = values
+        else:
+            columns[field] = np.array(['' if value is None else str(value) for value in values])
+    return columns, srs_id
+
+
+def read_parquet(path, fields, x_field='x', y_field='y'):
+    # columns of a Parquet file, points from its GeoParquet geometry column or from two coordinate columns
+    import json
+    import pyarrow.parquet as pq
+    table = pq.read_table(path)
+    columns = dict((field, table.column(field).to_numpy(zero_copy_only=False)) for field in fields)
+    metadata = table.schema.metadata or {}
+    srs_id = 0
+    if b'geo' in metadata:
+        geo = json.loads(metadata[b'geo'])
+        primary = geo['primary_column']
+        coordinates = np.array([point_wkb(value) for value in table.column(primary).to_pylist()],
+                               dtype=np.float64).reshape(-1, 2)
+        columns['x'] = coordinates[:, 0]
+        columns['y'] = coordinates[:, 1]
+        # a missing crs is longitude and latitude on WGS 84 and a null one is unknown
+        crs = geo['columns'][primary].get('crs', {'id': {'authority': 'OGC', 'code': 'CRS84'}})
+        crs_id = crs.get('id', {}) if isinstance(crs, dict) else {}
+        if crs_id.get('authority') == 'EPSG':
+            srs_id = int(crs_id['code'])
+        elif crs_id.get('authority') == 'OGC' and crs_id.get('code') == 'CRS84':
+            srs_id = 4326
+    else:
+        columns['x'] = table.column(x_field).to_numpy().astype(np.float64)
+        columns['y'] = table.column(y_field).to_numpy().astype(np.float64)
+    return columns, srs_id
+
+
+# input formats by the extension of the input path
+SOURCES = {'.csv', '.txt', '.gpkg', '.parquet'}
+
+
+def read_source(path, case_field, sort_field, primary_field, secondary_field=None, x_field='x', y_field='y'):
+    # read an open format point file into an ordered point store
+    # returns the points, the EPSG code of their coordinate system (0 when unknown) and the field
+    # types of the case and sort fields
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in SOURCES:
+        raise ValueError('No input format for the extension: {0}'.format(extension))
+    fields = [field for field in (case_field, sort_field, primary_field, secondary_field) if field]
+    fields = sorted(set(fields), key=fields.index)
+    if extension == '.gpkg':
+        columns, srs_id = read_geopackage(path, fields)
+    elif extension == '.parquet':
+        columns, srs_id = read_parquet(path, fields, x_field, y_field)
+    else:
+        columns, srs_id = read_csv(path, fields, x_field, y_field)
+    return from_columns(columns, case_field, sort_field, primary_field, secondary_field), srs_id, \
+        field_type(columns[case_field]), field_type(columns[sort_field])
+
+
+def from_columns(columns, case_field, sort_field, primary_field, secondary_field=None, x_field='x', y_field='y',
+                 oid_field=None):
+    # ordered point store from a mapping of column names to arrays or lists
+    point_count = len(columns[x_field])
+    records = {
+        'oid': np.arange(1, point_count + 1) if oid_field is None else np.asarray(columns[oid_field], dtype=np.int64),
+        'case': np.asarray(columns[case_field]),
+        'sort': np.asarray(columns[sort_field]),
+        'primary': np.asarray(columns[primary_field], dtype=np.float64),
+        'secondary': (np.full(point_count, np.nan) if secondary_field is None else
+                      np.asarray(columns[secondary_field], dtype=np.float64)),
+        'x': np.asarray(columns[x_field], dtype=np.float64),
+        'y': np.asarray(columns[y_field], dtype=np.float64)
+    }
+    return PointStore.from_numpy(records, ['oid', 'case', 'sort', 'primary', 'secondary', 'x', 'y']).ordered()
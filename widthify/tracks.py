@@ -0,0 +1,53 @@
+from itertools import groupby
+from operator import itemgetter
+
+import numpy as np
+
+
+def iter_tracks(rows, case_index=1):
+    # group rows already ordered by case into one list per track
+    # only the track currently being yielded is held in memory
+    for case, track in groupby(rows, key=itemgetter(case_index)):
+        yield case, list(track)
+
+
+def scan_range(values):
+    # running minimum and maximum of an iterable of values without materializing it
+    min_value = None
+    max_value = None
+    for value in values:
+        if value is None:
+            continue
+        if min_value is None or value < min_value:
+            min_value = value
+        if max_value is None or value > max_value:
+            max_value = value
+    return min_value, max_value
+
+
+class TrackIndex(object):
+    # start and end offsets of every track within points ordered by case, found once from the case column
+    # first and last flag, per point, whether it opens or closes its track so segments can be
+    # classified as first, continuation or terminal with a single lookup
+    def __init__(self, cases):
+        cases = np.asarray(cases)
+        point_count = len(cases)
+        change = cases[1:] != cases[:-1]
+        self.starts = np.flatnonzero(np.r_[point_count > 0, change])
+        self.ends = np.append(self.starts[1:], point_count) if point_count else self.starts.copy()
+        self.first = np.zeros(point_count, dtype=bool)
+        self.first[self.starts] = True
+        self.last = np.zeros(point_count, dtype=bool)
+        self.last[self.ends - 1] = True
+
+    def __len__(self):
+        return len(self.starts)
+
+    def segment_starts(self):
+        # index of the point each segment begins at, every point except the last of its track
+        return np.flatnonzero(~self.last)
+
+    def slices(self):
+        # slice of every track for zero-copy access to the ordered point columns
+        for start, end in zip(self.starts.tolist(), self.ends.tolist()):
+            yield slice(start, end)
@@ -0,0 +1,149 @@
+import numpy as np
+
+
+class WidthScale(object):
+    # linear stretch of the primary attribute range onto the [min_width, max_width] polygon widths
+    # the attribute range is captured once so widths can be produced for a whole column in one pass
+    def __init__(self, min_value, max_value, min_width, max_width):
+        self.min_value = float(min_value)
+        self.max_value = float(max_value)
+        self.min_width = float(min_width)
+        self.max_width = float(max_width)
+        self.range = self.max_value - self.min_value
+
+    @classmethod
+    def from_values(cls, values, min_width, max_width):
+        # derive the attribute range from the values themselves
+        values = np.asarray(values, dtype=np.float64)
+        return cls(values.min(), values.max(), min_width, max_width)
+
+    def widths(self, values):
+        # full polygon width for each attribute value, rounded to whole units
+        values = np.asarray(values, dtype=np.float64)
+        if self.range == 0:
+            # every value is equal, there is nothing to stretch so fall back to the minimum width
+            return np.full(values.shape, round(self.min_width, 0))
+        scaled = (self.max_width - self.min_width) * (values - self.min_value) / self.range + self.min_width
+        return np.round(scaled, 0)
+
+    def half_widths(self, values):
+        # offset distance either side of the track centre line for each attribute value
+        return self.widths(values) / 2
+
+
+# classification methods of the classed width mode
+EQUAL_INTERVAL = 'EQUAL_INTERVAL'
+QUANTILE = 'QUANTILE'
+JENKS = 'JENKS'
+MANUAL = 'MANUAL'
+
+# largest number of values natural breaks are optimized over, larger inputs are sampled evenly
+JENKS_SAMPLE = 3000
+
+
+def equal_interval_breaks(min_value, max_value, count):
+    # upper bound of each of count classes of equal width over the attribute range
+    return np.linspace(float(min_value), float(max_value), count + 1)[1:].tolist()
+
+
+def quantile_breaks(values, count):
+    # upper bound of each of count classes holding an equal share of the values
+    values = np.asarray(values, dtype=np.float64)
+    values = values[~np.isnan(values)]
+    return np.unique(np.quantile(values, np.linspace(0, 1, count + 1)[1:])).tolist()
+
+
+def jenks_breaks(values, count, sample=JENKS_SAMPLE):
+    # upper bound of each of count classes minimizing the squared deviation within classes (Fisher-Jenks)
+    values = np.sort(np.asarray(values, dtype=np.float64))
+    values = values[~np.isnan(values)]
+    if len(values) > sample:
+        values = values[np.linspace(0, len(values) - 1, sample).astype(np.intp)]
+    value_count = len(values)
+    count = min(count, value_count)
+
+    # squared deviation of any run of sorted values from its mean, through cumulative sums
+    total = np.r_[0, np.cumsum(values)]
+    total_sq = np.r_[0, np.cumsum(values ** 2)]
+
+    def deviation(first, last):
+        # values first up to and including last
+        size = last - first + 1
+        run = total[last + 1] - total[first]
+        return total_sq[last + 1] - total_sq[first] - run * run / size
+
+    # cost[j] is the least deviation of the first j + 1 values split into the classes so far and
+    # start[c][j] where the last of those classes begins
+    index = np.arange(value_count)
+    cost = deviation(np.zeros(value_count, dtype=np.intp), index)
+    starts = []
+    for classes in range(1, count):
+        next_cost = np.full(value_count, np.inf)
+        start = np.zeros(value_count, dtype=np.intp)
+        for last in range(classes, value_count):
+            first = np.arange(classes, last + 1)
+            candidate = cost[first - 1] + deviation(first, last)
+            best = int(np.argmin(candidate))
+            next_cost[last] = candidate[best]
+            start[last] = first[best]
+        cost = next_cost
+        starts.append(start)
+
+    # walk the class starts back from the last value
+    breaks = [values[-1]]
+    last = value_count - 1
+    for start in reversed(starts):
+        last = start[last] - 1
+        breaks.append(values[last])
+    return np.unique(breaks).tolist()
+
+
+class ClassedWidthScale(object):
+    # classes of the primary attribute mapped onto widths stepping evenly from min_width to max_width
+    # breaks hold the upper bound of every class, values above the last break fall in the last class
+    def __init__(self, breaks, min_width, max_width):
+        self.breaks = np.unique(np.asarray(breaks, dtype=np.float64))
+        self.min_width = float(min_width)
+        self.max_width = float(max_width)
+        steps = max(len(self.breaks) - 1, 1)
+        self.class_widths = np.round(self.min_width + (self.max_width - self.min_width) *
+                                     np.arange(len(self.breaks)) / steps, 0)
+
+    @classmethod
+    def from_method(cls, method, count, min_width, max_width, values=None, min_value=None, max_value=None,
+                    breaks=None):
+        # compute the breaks once with the chosen classification method
+        if method == EQUAL_INTERVAL:
+            breaks = equal_interval_breaks(min_value, max_value, count)
+        elif method == QUANTILE:
+            breaks = quantile_breaks(values, count)
+        elif method == JENKS:
+            breaks = jenks_breaks(values, count)
+        elif method != MANUAL:
+            raise ValueError('Unknown classification method: {0}'.format(method))
+        elif not breaks:
+            raise ValueError('Manual classification requires break values')
+        return cls(breaks, min_width, max_width)
+
+    def classes(self, values):
+        # class number of each attribute value counting from 1, 0 for nulls
+        values = np.asarray(values, dtype=np.float64)
+        classes = np.minimum(np.searchsorted(self.breaks, values, side='left'), len(self.breaks) - 1) + 1
+        classes[np.isnan(values)] = 0
+        return classes.astype(np.int16)
+
+    def widths(self, values):
+        # full polygon width for each attribute value, the width of its class
+        values = np.asarray(values, dtype=np.float64)
+        widths = self.class_widths[self.classes(values) - 1]
+        widths[np.isnan(values)] = np.nan
+        return widths
+
+    def half_widths(self, values):
+        # offset distance either side of the track centre line for each attribute value
+        return self.widths(values) / 2
+
+    def break_dict(self):
+        # upper break and width of every class keyed on its class number
+        return dict((number + 1, (float(upper), float(width)))
+                    for number, (upper, width) in enumerate(zip(self.breaks, self.class_widths)))
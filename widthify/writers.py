@@ -0,0 +1,420 @@
+import csv
+import datetime
+import json
+import os
+import sqlite3
+import struct
+from collections import OrderedDict
+
+
+def output_fields(case_type, sort_type):
+    # schema of the output polygons as (name, type) pairs using geoprocessing field types
+    return [
+        ('POINT_FID', 'LONG'),
+        ('CASE_FIELD', case_type),
+        ('SORT_FIELD', sort_type),
+        ('PRIMARY_VALUE_FROM', 'DOUBLE'),
+        ('PRIMARY_VALUE_TO', 'DOUBLE'),
+        ('PRIMARY_CLASSED_FROM', 'SHORT'),
+        ('PRIMARY_CLASSED_TO', 'SHORT'),
+        ('SECONDARY_VALUE_FROM', 'DOUBLE'),
+        ('SECONDARY_VALUE_TO', 'DOUBLE'),
+        ('POLYGON_ANGLE', 'DOUBLE')
+    ]
+
+
+def track_fields(case_type, sort_type):
+    # schema of the output polygons when each track is written as a single polygon
+    return [
+        ('POINT_FID', 'LONG'),
+        ('CASE_FIELD', case_type),
+        ('SORT_FROM', sort_type),
+        ('SORT_TO', sort_type),
+        ('POINT_COUNT', 'LONG'),
+        ('PRIMARY_VALUE_MIN', 'DOUBLE'),
+        ('PRIMARY_VALUE_MAX', 'DOUBLE'),
+        ('SECONDARY_VALUE_MIN', 'DOUBLE'),
+        ('SECONDARY_VALUE_MAX', 'DOUBLE')
+    ]
+
+
+def sink_type(field_type):
+    # geoprocessing field type as the sinks look it up, the tool passes arcpy field types such as 'Long'
+    return field_type.upper()
+
+
+def rejection(record, error, field=None):
+    # a record the sink rejected, keyed on the type of the error and the field it arose in when known
+    # so failures group together whatever values they quote, along with the message of the error
+    key = type(error).__name__ if field is None else '{0} in {1}'.format(type(error).__name__, field)
+    return record, key, str(error)
+
+
+def polygon_wkt(ring):
+    # well-known text of a single ring polygon, closing the ring if required
+    if ring[0] != ring[-1]:
+        ring = list(ring) + [ring[0]]
+    return 'POLYGON (({0}))'.format(', '.join('{0!r} {1!r}'.format(x, y) for x, y in ring))
+
+
+def polygon_wkb(ring):
+    # little endian well-known binary of a single ring polygon, closing the ring if required
+    if ring[0] != ring[-1]:
+        ring = list(ring) + [ring[0]]
+    coordinates = [value for vertex in ring for value in vertex]
+    return struct.pack('<BIII{0}d'.format(len(coordinates)), 1, 3, 1, len(ring), *coordinates)
+
+
+class Writer(object):
+    # buffers polygon records and hands them to a sink in batches
+    # each record is the list of attribute values of the output fields followed by the polygon ring
+    # records the sink rejects are collected for an error report instead of stopping the run
+    # with instruments every batch handed to the sink is timed as a call of the named stage and the
+    # rejected records counted as insert failures
+    def __init__(self, sink, batch_size=10000, instruments=None, stage='write'):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.batch = []
+        self.written = 0
+        self.errors = []
+        self.instruments = instruments
+        self.stage = stage
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, record):
+        self.batch.append(record)
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.batch:
+            return
+        if self.instruments is None:
+            failed = self.sink.write_batch(self.batch)
+        else:
+            with self.instruments.stage(self.stage, len(self.batch)):
+                failed = self.sink.write_batch(self.batch)
+            self.instruments.count('insert_failures', len(failed))
+        self.written += len(self.batch) - len(failed)
+        self.errors.extend(failed)
+        self.batch = []
+
+    def close(self):
+        self.flush()
+        self.sink.close()
+
+    def error_report(self, samples=5):
+        # summary of the rejected records grouped by error type and field, a line per group with the
+        # message of its first error and a few sample POINT_FIDs
+        if not self.errors:
+            return []
+        grouped = OrderedDict()
+        for record, key, message in self.errors:
+            grouped.setdefault(key, (message, []))[1].append(record[0])
+        lines = ['{0} polygons failed to write:'.format(len(self.errors))]
+        for key, (message, point_fids) in grouped.items():
+            lines.append('...{0} x {1}, e.g. {2} (POINT_FID {3}{4})'.format(
+                len(point_fids), key, message, ', '.join(str(fid) for fid in point_fids[:samples]),
+                ', ...' if len(point_fids) > samples else ''))
+        return lines
+
+
+class MemorySink(object):
+    # keeps the records in a list, used to measure the pipeline without any output cost
+    def __init__(self, fields=None):
+        self.fields = fields
+        self.records = []
+
+    def write_batch(self, records):
+        self.records.extend(records)
+        return []
+
+    def close(self):
+        pass
+
+
+class FeatureClassSink(object):
+    # geodatabase feature class written through an arcpy insert cursor
+    # with append the feature class must already exist and the records are added to it
+    def __init__(self, path, fields, spatial_reference, append=False):
+        import arcpy
+        if not append:
+            workspace, name = os.path.split(path)
+            arcpy.CreateFeatureclass_management(out_path=workspace, out_name=name, geometry_type='POLYGON',
+                                                spatial_reference=spatial_reference)
+            arcpy.AddFields_management(in_table=path, field_description=[list(field) for field in fields])
+        self.cursor = arcpy.da.InsertCursor(path, [field[0] for field in fields] + ['SHAPE@'])
+
+    def write_batch(self, records):
+        # insert cursors have no bulk insert, rows are inserted one at a time within the open cursor
+        failed = []
+        for record in records:
+            try:
+                self.cursor.insertRow(record)
+            except Exception as e:
+                failed.append(rejection(record, e))
+        return failed
+
+    def close(self):
+        del self.cursor
+
+
+class TableSink(object):
+    # geodatabase table without geometry written through an arcpy insert cursor, used for the
+    # per segment attributes of the track polygons
+    def __init__(self, path, fields):
+        import arcpy
+        workspace, name = os.path.split(path)
+        arcpy.CreateTable_management(workspace, name)
+        arcpy.AddFields_management(in_table=path, field_description=[list(field) for field in fields])
+        self.cursor = arcpy.da.InsertCursor(path, [field[0] for field in fields])
+
+    def write_batch(self, records):
+        failed = []
+        for record in records:
+            try:
+                self.cursor.insertRow(record)
+            except Exception as e:
+                failed.append(rejection(record, e))
+        return failed
+
+    def close(self):
+        del self.cursor
+
+
+class GeoPackageSink(object):
+    # OGC GeoPackage polygon table written through sqlite3 with one transaction per batch
+    sql_types = {'SHORT': 'SMALLINT', 'LONG': 'INTEGER', 'DOUBLE': 'DOUBLE', 'FLOAT': 'FLOAT', 'TEXT': 'TEXT',
+                 'DATE': 'DATETIME'}
+
+    def __init__(self, path, fields, srs_id=0, srs_wkt=None, table=None):
+        if os.path.exists(path):
+            os.remove(path)
+        self.table = table or os.path.splitext(os.path.basename(path))[0]
+        self.srs_id = srs_id
+        self.connection = sqlite3.connect(path)
+        self.fields = fields
+        self.extent = None
+        self._create(srs_wkt)
+        self.insert_sql = 'INSERT INTO "{0}" (geom, {1}) VALUES (?{2})'.format(
+            self.table, ', '.join('"{0}"'.format(field[0]) for field in fields), ', ?' * len(fields))
+
+    def _create(self, srs_wkt):
+        with self.connection:
+            self.connection.execute('PRAGMA application_id = 1196444487')
+            self.connection.execute('PRAGMA user_version = 10200')
+            self.connection.execute(
+                'CREATE TABLE gpkg_spatial_ref_sys (srs_name TEXT NOT NULL, srs_id INTEGER PRIMARY KEY, '
+                'organization TEXT NOT NULL, organization_coordsys_id INTEGER NOT NULL, '
+                'definition TEXT NOT NULL, description TEXT)')
+            self.connection.executemany('INSERT INTO gpkg_spatial_ref_sys VALUES (?, ?, ?, ?, ?, ?)', [
+                ('Undefined cartesian SRS', -1, 'NONE', -1, 'undefined', None),
+                ('Undefined geographic SRS', 0, 'NONE', 0, 'undefined', None)])
+            if self.srs_id not in (-1, 0):
+                self.connection.execute('INSERT OR REPLACE INTO gpkg_spatial_ref_sys VALUES (?, ?, ?, ?, ?, ?)',
+                                        (str(self.srs_id), self.srs_id, 'EPSG', self.srs_id,
+                                         srs_wkt or 'undefined', None))
+            self.connection.execute(
+                'CREATE TABLE gpkg_contents (table_name TEXT NOT NULL PRIMARY KEY, data_type TEXT NOT NULL, '
+                'identifier TEXT UNIQUE, description TEXT DEFAULT \'\', '
+                'last_change DATETIME NOT NULL DEFAULT (strftime(\'%Y-%m-%dT%H:%M:%fZ\',\'now\')), '
+                'min_x DOUBLE, min_y DOUBLE, max_x DOUBLE, max_y DOUBLE, srs_id INTEGER)')
+            self.connection.execute(
+                'CREATE TABLE gpkg_geometry_columns (table_name TEXT NOT NULL, column_name TEXT NOT NULL, '
+                'geometry_type_name TEXT NOT NULL, srs_id INTEGER NOT NULL, z TINYINT NOT NULL, '
+                'm TINYINT NOT NULL, CONSTRAINT pk_geom_cols PRIMARY KEY (table_name, column_name))')
+            self.connection.execute('CREATE TABLE "{0}" (fid INTEGER PRIMARY KEY AUTOINCREMENT, geom POLYGON, {1})'.format(
+                self.table, ', '.join('"{0}" {1}'.format(name, self.sql_types[sink_type(field_type)])
+                                      for name, field_type in self.fields)))
+            self.connection.execute('INSERT INTO gpkg_contents (table_name, data_type, identifier, srs_id) '
+                                    'VALUES (?, \'features\', ?, ?)', (self.table, self.table, self.srs_id))
+            self.connection.execute('INSERT INTO gpkg_geometry_columns VALUES (?, \'geom\', \'POLYGON\', ?, 0, 0)',
+                                    (self.table, self.srs_id))
+
+    def _geometry(self, ring):
+        # GeoPackage binary header with an xy envelope, followed by the well-known binary polygon
+        xs = [vertex[0] for vertex in ring]
+        ys = [vertex[1] for vertex in ring]
+        envelope = (min(xs), max(xs), min(ys), max(ys))
+        if self.extent is None:
+            self.extent = envelope
+        else:
+            self.extent = (min(self.extent[0], envelope[0]), max(self.extent[1], envelope[1]),
+                           min(self.extent[2], envelope[2]), max(self.extent[3], envelope[3]))
+        header = struct.pack('<2sBBi4d', b'GP', 0, 0b00000011, self.srs_id, *envelope)
+        return header + polygon_wkb(ring)
+
+    def _row(self, record):
+        values = [value.isoformat() if isinstance(value, datetime.datetime) else value for value in record[:-1]]
+        return [self._geometry(record[-1])] + values
+
+    def write_batch(self, records):
+        try:
+            with self.connection:
+                self.connection.executemany(self.insert_sql, [self._row(record) for record in records])
+            return []
+        except Exception:
+            # the batch was rolled back, insert the rows individually to isolate the failures
+            failed = []
+            with self.connection:
+                for record in records:
+                    try:
+                        self.connection.execute(self.insert_sql, self._row(record))
+                    except Exception as e:
+                        failed.append(rejection(record, e))
+            return failed
+
+    def close(self):
+        # record the extent of the written polygons in the contents table
+        if self.extent is not None:
+            with self.connection:
+                self.connection.execute('UPDATE gpkg_contents SET min_x = ?, max_x = ?, min_y = ?, max_y = ? '
+                                        'WHERE table_name = ?', self.extent + (self.table,))
+        self.connection.close()
+
+
+def projjson(srs_id=0, srs_wkt=None):
+    # PROJJSON of a coordinate system given as WKT or an EPSG code, None when it cannot be resolved
+    # as pyproj is not installed or the coordinate system is unknown
+    try:
+        from pyproj import CRS
+        from pyproj.exceptions import CRSError
+    except ImportError:
+        return None
+    try:
+        return (CRS.from_wkt(srs_wkt) if srs_wkt else CRS.from_epsg(srs_id)).to_json_dict()
+    except CRSError:
+        return None
+
+
+class GeoParquetSink(object):
+    # GeoParquet file with WKB geometry written through pyarrow, one row group per batch
+    # the crs is left out for longitude and latitude on WGS 84, the GeoParquet default, and is otherwise
+    # written as PROJJSON through pyproj, or as null (unknown) without it
+    def __init__(self, path, fields, srs_id=0, srs_wkt=None):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self.pa = pa
+        arrow_types = {'SHORT': pa.int16(), 'LONG': pa.int32(), 'DOUBLE': pa.float64(), 'FLOAT': pa.float32(),
+                       'TEXT': pa.string(), 'DATE': pa.timestamp('ms')}
+        self.fields = fields
+        column = {'encoding': 'WKB', 'geometry_types': ['Polygon']}
+        if srs_id != 4326:
+            column['crs'] = projjson(srs_id, srs_wkt) if srs_id not in (-1, 0) or srs_wkt else None
+        metadata = {'version': '1.0.0', 'primary_column': 'geometry', 'columns': {'geometry': column}}
+        self.schema = pa.schema([pa.field(name, arrow_types[sink_type(field_type)])
+                                 for name, field_type in fields] + [pa.field('geometry', pa.binary())],
+                                metadata={'geo': json.dumps(metadata)})
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def _table(self, records):
+        columns = [[record[i] for record in records] for i in range(len(self.fields))]
+        columns.append([polygon_wkb(record[-1]) for record in records])
+        return self.pa.Table.from_arrays([self.pa.array(values, type=field.type)
+                                          for values, field in zip(columns, self.schema)], schema=self.schema)
+
+    def _field(self, record):
+        # name of the first field whose value of record does not convert to its column type
+        for value, field in zip(record[:-1], self.schema):
+            try:
+                self.pa.array([value], type=field.type)
+            except Exception:
+                return field.name
+        return None
+
+    def write_batch(self, records):
+        try:
+            self.writer.write_table(self._table(records))
+            return []
+        except Exception:
+            # write the rows that convert and report the ones that do not
+            written = []
+            failed = []
+            for record in records:
+                try:
+                    self._table([record])
+                    written.append(record)
+                except Exception as e:
+                    failed.append(rejection(record, e, self._field(record)))
+            if written:
+                self.writer.write_table(self._table(written))
+            return failed
+
+    def close(self):
+        self.writer.close()
+
+
+class FlatGeobufSink(object):
+    # FlatGeobuf file written through fiona in batches of records
+    fiona_types = {'SHORT': 'int', 'LONG': 'int', 'DOUBLE': 'float', 'FLOAT': 'float', 'TEXT': 'str',
+                   'DATE': 'datetime'}
+
+    def __init__(self, path, fields, srs_id=0, srs_wkt=None):
+        import fiona
+        schema = {'geometry': 'Polygon',
+                  'properties': OrderedDict((name, self.fiona_types[sink_type(field_type)])
+                                            for name, field_type in fields)}
+        if srs_wkt:
+            crs = {'crs_wkt': srs_wkt}
+        elif srs_id not in (-1, 0):
+            crs = {'crs': 'EPSG:{0}'.format(srs_id)}
+        else:
+            crs = {}
+        self.fields = fields
+        self.collection = fiona.open(path, 'w', driver='FlatGeobuf', schema=schema, **crs)
+
+    def _feature(self, record):
+        ring = list(record[-1])
+        if ring[0] != ring[-1]:
+            ring.append(ring[0])
+        return {'geometry': {'type': 'Polygon', 'coordinates': [ring]},
+                'properties': OrderedDict((field[0], value) for field, value in zip(self.fields, record))}
+
+    def write_batch(self, records):
+        try:
+            self.collection.writerecords([self._feature(record) for record in records])
+            return []
+        except Exception:
+            failed = []
+            for record in records:
+                try:
+                    self.collection.write(self._feature(record))
+                except Exception as e:
+                    failed.append(rejection(record, e))
+            return failed
+
+    def close(self):
+        self.collection.close()
+
+
+class CsvSink(object):
+    # comma separated text with the polygon as well-known text in a final WKT column
+    def __init__(self, path, fields, srs_id=0, srs_wkt=None):
+        self.file = open(path, 'w', newline='')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow([field[0] for field in fields] + ['WKT'])
+
+    def write_batch(self, records):
+        self.writer.writerows(record[:-1] + [polygon_wkt(record[-1])] for record in records)
+        return []
+
+    def close(self):
+        self.file.close()
+
+
+# open format sinks chosen by the extension of the output path
+SINKS = {'.gpkg': GeoPackageSink, '.sqlite': GeoPackageSink, '.parquet': GeoParquetSink,
+         '.fgb': FlatGeobufSink, '.csv': CsvSink}
+
+
+def open_sink(path, fields, srs_id=0, srs_wkt=None):
+    # open the open format sink matching the extension of path
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in SINKS:
+        raise ValueError('No output format for the extension: {0}'.format(extension))
+    return SINKS[extension](path, fields, srs_id, srs_wkt)